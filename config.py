@@ -5,6 +5,7 @@ Configuration and default parameters for the VNS-CVRP solver.
 
 # VNS Parameters
 K_MAX = 5                    # Maximum shaking neighborhood size
+SHAKE_REWARD_DECAY = 0.1     # Weight of the latest reward in a shake's running score
 DEFAULT_MAX_ITER = 1000      # Default maximum iterations
 DEFAULT_MAX_TIME = 600       # Default maximum time in seconds
 
@@ -25,12 +26,30 @@ CONSTRUCTION_METHODS = [
     'random'
 ]
 
+# Multi-start construction: std of the savings noise, relative to the
+# mean depot distance (Clarke-Wright starts after the first one)
+MULTISTART_SAVINGS_NOISE = 0.05
+
 # Neighborhood improvement threshold
 IMPROVEMENT_THRESHOLD = 0.001
 
+# Relocate / swap / or-opt only try positions next to the K nearest
+# customers of the moved customer (0 = exhaustive search)
+NEIGHBOR_LIST_SIZE = 20
+
 # Animation
 DEFAULT_FPS = 2
 DEFAULT_ANIMATION_FILENAME = "vns_animation.mp4"
+ANIMATION_MIN_REL_IMPROVEMENT = 1e-4   # Minimum relative cost drop to store a frame
+ANIMATION_MAX_FRAMES = 300             # Frames are decimated beyond this count
+# Fast x264 encoding; +faststart moves the moov atom up front (streamable MP4)
+FFMPEG_EXTRA_ARGS = [
+    '-preset', 'ultrafast',
+    '-tune', 'zerolatency',
+    '-pix_fmt', 'yuv420p',
+    '-movflags', '+faststart',
+    '-threads', '0',
+]
 
 # Output
 DEFAULT_PLOT_DPI = 300
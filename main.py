@@ -11,9 +11,10 @@ Instance .vrp and .sol files should be placed in data/instances/ and data/soluti
 
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 from src.parser import parse_vrp, parse_sol
-from src.vns import VNS_solver
+from src.vns import VNS_solver, VNS_independent_runs
 from src.visualization import plot_solution, save_solution
 
 # ── Configuration ──────────────────────────────────────────────────────────────
@@ -21,6 +22,15 @@ USE_OR_OPT         = False           # Or-opt is expensive; keep False for speed
 CONSTRUCTION_METHOD = 'Clarke-Wright' # Options: Clarke-Wright | nearest_neighbor |
                                       #          greedy | cheapest_insertion | random
 ENABLE_ANIMATION   = True           # Set True to record an MP4 (requires ffmpeg)
+PARALLEL_INSTANCES = True           # Solve instances in parallel, one process each
+MULTISTART         = os.cpu_count() or 1  # Initial solutions built in parallel (best kept);
+                                          # used by Clarke-Wright and random only
+PARALLEL_DESCENTS  = 1              # Shaken solutions descended in parallel per VNS iteration
+ROUND_DISTANCES    = False          # Integer EUC_2D distances, as used by CVRPLIB best-known costs
+SINGLE_PRECISION   = False          # float32 distance matrix (half the memory, for large instances)
+INDEPENDENT_RUNS   = 1              # Independent seeded VNS runs in parallel per instance (best kept)
+ADAPTIVE_SHAKING   = True           # Pick the shake by UCB1 on recent payoff (False = cyclic)
+VERBOSE            = True           # Print a progress row for every accepted VNS solution
 
 # (instance_name, max_iter, max_time_seconds)
 instances = [
@@ -37,7 +47,15 @@ os.makedirs(RESULTS_DIR, exist_ok=True)
 def run_instance(instance_name, max_iter=1000, max_time=600,
                  construction=CONSTRUCTION_METHOD,
                  use_or_opt=USE_OR_OPT,
-                 enable_animation=ENABLE_ANIMATION):
+                 enable_animation=ENABLE_ANIMATION,
+                 multistart=MULTISTART,
+                 parallel_descents=PARALLEL_DESCENTS,
+                 round_distances=ROUND_DISTANCES,
+                 single_precision=SINGLE_PRECISION,
+                 independent_runs=INDEPENDENT_RUNS,
+                 adaptive_shaking=ADAPTIVE_SHAKING,
+                 verbose=VERBOSE,
+                 show_plot=True):
     """
     Load, solve, and report results for a single CVRP instance.
 
@@ -49,6 +67,14 @@ def run_instance(instance_name, max_iter=1000, max_time=600,
     construction     : initial solution heuristic
     use_or_opt       : enable Or-opt in VND
     enable_animation : record improvement video
+    multistart       : number of parallel initial solutions (best is kept)
+    parallel_descents : shaken solutions descended in parallel per iteration
+    round_distances  : solve with integer (rounded) distances
+    single_precision : solve with a float32 distance matrix
+    independent_runs : number of independent VNS runs (best is kept)
+    adaptive_shaking : choose the shaking operator by UCB1 instead of cycling
+    verbose          : print the per-improvement progress table
+    show_plot        : display the solution plot (disabled in worker processes)
 
     Returns
     -------
@@ -78,14 +104,25 @@ def run_instance(instance_name, max_iter=1000, max_time=600,
     capacity = instance['capacity']
 
     # Solve
-    my_solution, my_cost, recorder = VNS_solver(
-        coords, demands, capacity,
+    solver_kwargs = dict(
         max_iter=max_iter,
         max_time=max_time,
         construction_method=construction,
         use_or_opt=use_or_opt,
         enable_animation=enable_animation,
+        multistart=multistart,
+        parallel_descents=parallel_descents,
+        round_distances=round_distances,
+        single_precision=single_precision,
+        adaptive_shaking=adaptive_shaking,
+        verbose=verbose,
     )
+    if independent_runs > 1:
+        my_solution, my_cost, recorder = VNS_independent_runs(
+            coords, demands, capacity, independent_runs, **solver_kwargs)
+    else:
+        my_solution, my_cost, recorder = VNS_solver(coords, demands, capacity,
+                                                    **solver_kwargs)
 
     # Report
     print(f"\n{'='*70}")
@@ -113,6 +150,7 @@ def run_instance(instance_name, max_iter=1000, max_time=600,
         coords, my_solution,
         title=f"{instance_name}  |  VNS = {my_cost:.1f}",
         save_filename=plot_out,
+        show=show_plot,
     )
 
     # Animation
@@ -127,8 +165,25 @@ if __name__ == "__main__":
     results = []
     total_start = time.time()
 
-    for instance_name, max_iter, max_time in instances:
-        my_cost, best_cost = run_instance(instance_name, max_iter, max_time)
+    if PARALLEL_INSTANCES and len(instances) > 1:
+        # Instances are independent: solve them concurrently, one per process
+        workers = min(len(instances), os.cpu_count() or 1)
+        # Share the cores among the instance workers' multi-start pools
+        multistart = max(1, MULTISTART // workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(run_instance, instance_name, max_iter, max_time,
+                                multistart=multistart, show_plot=False)
+                for instance_name, max_iter, max_time in instances
+            ]
+            outcomes = [future.result() for future in futures]
+    else:
+        outcomes = [
+            run_instance(instance_name, max_iter, max_time)
+            for instance_name, max_iter, max_time in instances
+        ]
+
+    for (instance_name, _, _), (my_cost, best_cost) in zip(instances, outcomes):
         if my_cost is not None:
             results.append((instance_name, my_cost, best_cost))
 
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Optional Numba-compiled kernels for the hot numeric loops.
+
+Numba is not a hard dependency: if it cannot be imported, NUMBA_AVAILABLE
+is False and callers fall back to their NumPy / pure-Python code paths.
+
+Construction kernels operate on contiguous NumPy arrays (dist: float64[:, :],
+demands: int64[:]) and return flat int64 arrays of customers in which
+routes are separated by -1; use `unflatten_routes` at the Python boundary.
+Local search kernels take whole solutions as (nodes, bounds) arrays; see
+`flatten_solution` and `split_solution`.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when Numba is not installed."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+def flatten_solution(solution):
+    """
+    Concatenate the routes of a solution (depots included) into one array.
+
+    Returns (nodes, bounds): int32 nodes, and int64 bounds such that route
+    r is nodes[bounds[r]:bounds[r + 1]]. Inverse of `split_solution`.
+    """
+    bounds = np.zeros(len(solution) + 1, dtype=np.int64)
+    np.cumsum([len(route) for route in solution], out=bounds[1:])
+    nodes = np.fromiter(chain.from_iterable(solution), dtype=np.int32,
+                        count=bounds[-1])
+    return nodes, bounds
+
+
+def split_solution(nodes, bounds):
+    """Convert (nodes, bounds) from `flatten_solution` back into a list of routes."""
+    flat = nodes.tolist()
+    bounds = bounds.tolist()
+    return [flat[bounds[r]:bounds[r + 1]] for r in range(len(bounds) - 1)]
+
+
+def unflatten_routes(flat):
+    """Convert a -1 separated flat customer array into a list of routes."""
+    routes = []
+    route = [0]
+    for c in flat.tolist():
+        if c == -1:
+            route.append(0)
+            routes.append(route)
+            route = [0]
+        else:
+            route.append(c)
+    return routes
+
+
+@njit(cache=True)
+def nn_kernel(dist, demands, capacity):
+    """Nearest Neighbor construction; see construction.nearest_neighbor_vrp."""
+    n = dist.shape[0]
+    unvisited = np.ones(n, dtype=np.bool_)
+    unvisited[0] = False
+    remaining = n - 1
+
+    flat = np.empty(2 * n, dtype=np.int64)
+    size = 0
+
+    while remaining > 0:
+        current = 0
+        load = 0
+        route_len = 0
+
+        while remaining > 0:
+            best_dist = np.inf
+            best_customer = -1
+            for c in range(1, n):
+                if unvisited[c] and load + demands[c] <= capacity:
+                    d = dist[current, c]
+                    if d < best_dist:
+                        best_dist = d
+                        best_customer = c
+
+            if best_customer == -1:
+                break
+
+            flat[size] = best_customer
+            size += 1
+            route_len += 1
+            current = best_customer
+            load += demands[best_customer]
+            unvisited[best_customer] = False
+            remaining -= 1
+
+        if route_len == 0:
+            # Remaining customers exceed the vehicle capacity on their own
+            break
+        flat[size] = -1
+        size += 1
+
+    return flat[:size]
+
+
+@njit(cache=True)
+def cheapest_insertion_kernel(dist, demands, capacity, farthest):
+    """
+    Cheapest Insertion construction; see construction.cheapest_insertion_vrp.
+
+    Routes are kept as successor links (`succ`) starting from `first[r]`,
+    so an insertion is O(1). Ties are broken by customer, route, then
+    position.
+    """
+    n = dist.shape[0]
+    succ = np.zeros(n, dtype=np.int64)
+    first = np.zeros(n, dtype=np.int64)
+    loads = np.zeros(n, dtype=np.int64)
+    unvisited = np.ones(n, dtype=np.bool_)
+    unvisited[0] = False
+
+    first[0] = farthest
+    succ[farthest] = 0
+    loads[0] = demands[farthest]
+    n_routes = 1
+    unvisited[farthest] = False
+    remaining = n - 2
+
+    best_inc = np.empty(n, dtype=np.float64)
+    best_route = np.empty(n, dtype=np.int64)
+    best_prev = np.empty(n, dtype=np.int64)
+
+    while remaining > 0:
+        for c in range(1, n):
+            best_inc[c] = np.inf
+            if not unvisited[c]:
+                continue
+            for r in range(n_routes):
+                if loads[r] + demands[c] > capacity:
+                    continue
+                a = 0
+                b = first[r]
+                while True:
+                    inc = dist[a, c] + dist[c, b] - dist[a, b]
+                    if inc < best_inc[c]:
+                        best_inc[c] = inc
+                        best_route[c] = r
+                        best_prev[c] = a
+                    if b == 0:
+                        break
+                    a = b
+                    b = succ[b]
+
+        customer = -1
+        value = np.inf
+        for c in range(1, n):
+            if unvisited[c] and best_inc[c] < value:
+                value = best_inc[c]
+                customer = c
+
+        if customer == -1:
+            for c in range(1, n):
+                if unvisited[c]:
+                    customer = c
+                    break
+            unvisited[customer] = False
+            remaining -= 1
+            if demands[customer] <= capacity:
+                first[n_routes] = customer
+                succ[customer] = 0
+                loads[n_routes] = demands[customer]
+                n_routes += 1
+        else:
+            r = best_route[customer]
+            a = best_prev[customer]
+            if a == 0:
+                succ[customer] = first[r]
+                first[r] = customer
+            else:
+                succ[customer] = succ[a]
+                succ[a] = customer
+            loads[r] += demands[customer]
+            unvisited[customer] = False
+            remaining -= 1
+
+    flat = np.empty(2 * n, dtype=np.int64)
+    size = 0
+    for r in range(n_routes):
+        c = first[r]
+        while c != 0:
+            flat[size] = c
+            size += 1
+            c = succ[c]
+        flat[size] = -1
+        size += 1
+
+    return flat[:size]
+
+
+@njit(cache=True, fastmath=True)
+def two_opt_intra_route(route, dist, threshold):
+    """
+    2-opt on a single closed route (depot at both ends), in place.
+
+    Each pass scans all (i, j) pairs for the best segment reversal and
+    applies it with a two-pointer swap; passes repeat until no move
+    improves the route by more than `threshold`. Returns the total cost
+    change (0.0 if the route is unchanged). Deltas are computed in float64
+    even for a float32 matrix.
+    """
+    n = route.shape[0]
+    total_delta = 0.0
+    while True:
+        best_delta = -threshold
+        best_i = -1
+        best_j = -1
+        for i in range(1, n - 2):
+            a = route[i - 1]
+            b = route[i]
+            d_ab = np.float64(dist[a, b])
+            for j in range(i + 1, n - 1):
+                c = route[j]
+                d = route[j + 1]
+                delta = (np.float64(dist[a, c]) + np.float64(dist[b, d]) -
+                         d_ab - np.float64(dist[c, d]))
+                if delta < best_delta:
+                    best_delta = delta
+                    best_i = i
+                    best_j = j
+
+        if best_i == -1:
+            return total_delta
+
+        lo = best_i
+        hi = best_j
+        while lo < hi:
+            tmp = route[lo]
+            route[lo] = route[hi]
+            route[hi] = tmp
+            lo += 1
+            hi -= 1
+        total_delta += best_delta
+
+
+@njit(cache=True, fastmath=True)
+def two_opt_intra_routes(nodes, bounds, dist, threshold):
+    """
+    two_opt_intra_route on every route of a flattened solution, in place.
+
+    Takes (nodes, bounds) from `flatten_solution`, so a whole solution
+    crosses the Python boundary once. Returns the total cost change.
+    """
+    total_delta = 0.0
+    for r in range(bounds.shape[0] - 1):
+        total_delta += two_opt_intra_route(nodes[bounds[r]:bounds[r + 1]],
+                                           dist, threshold)
+    return total_delta
+
+
+@njit(cache=True, fastmath=True)
+def path_cost(path, dist):
+    """
+    Sum of dist over consecutive nodes of `path`, accumulated in float64.
+
+    A whole solution can be passed as its concatenated routes: the depot
+    to depot steps between routes add dist[0, 0] = 0.
+    """
+    cost = 0.0
+    for i in range(path.shape[0] - 1):
+        cost += dist[path[i], path[i + 1]]
+    return cost
@@ -6,46 +6,89 @@ Records improvement frames and exports them as an MP4 video using FFmpeg.
 Only improvement steps are recorded to keep file sizes manageable.
 """
 
-from copy import deepcopy
+import subprocess
+
+import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation, FFMpegWriter
+from matplotlib.animation import FuncAnimation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from config import (
+    DEFAULT_FPS,
+    DEFAULT_ANIMATION_FILENAME,
+    ANIMATION_MIN_REL_IMPROVEMENT,
+    ANIMATION_MAX_FRAMES,
+    FFMPEG_EXTRA_ARGS,
+)
 
-from config import DEFAULT_FPS, DEFAULT_ANIMATION_FILENAME
+ROUTE_COLORS = plt.cm.tab20.colors
 
 
 class VNSAnimationRecorder:
     """
     Records VNS improvement frames and exports an animated video.
 
-    Only frames where the objective cost strictly improves are stored
-    (plus the initial solution), so the video shows the progression
-    of solution quality over time.
+    Only frames where the objective cost improves by at least a relative
+    threshold are stored (plus the initial solution), so the video shows
+    the progression of solution quality over time. The number of stored
+    frames is capped: when the cap is reached, every second interior frame
+    is dropped, which bounds the encoding time of long runs.
     """
 
-    def __init__(self, coords, initial_solution, initial_cost):
-        self.coords = coords
+    def __init__(self, coords, initial_solution, initial_cost,
+                 min_rel_improvement=ANIMATION_MIN_REL_IMPROVEMENT,
+                 max_frames=ANIMATION_MAX_FRAMES):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.min_rel_improvement = min_rel_improvement
+        self.max_frames = max_frames
         self.frames = []
         self.add_frame(initial_solution, initial_cost, "Initial Solution", "", force=True)
 
+    def wants_frame(self, cost):
+        """
+        True if add_frame would store a frame with this cost, i.e. it
+        improves the cost of the last stored frame by more than
+        `min_rel_improvement` (relative).
+
+        Lets callers skip building the frame's labels for rejected frames.
+        """
+        if not self.frames:
+            return True
+        last_cost = self.frames[-1]['cost']
+        threshold = max(1e-6, self.min_rel_improvement * abs(last_cost))
+        return cost < last_cost - threshold
+
     def add_frame(self, solution, cost, operation, details, force=False):
         """
         Add a frame to the recording.
 
-        A frame is only stored if it represents a cost improvement over the
-        last stored frame, or if force=True (e.g. for the initial solution).
+        A frame is only stored if `wants_frame(cost)`, or if force=True
+        (e.g. for the initial solution).
         """
-        if force or not self.frames or cost < self.frames[-1]['cost'] - 1e-6:
-            self.frames.append({
-                'solution': deepcopy(solution),
-                'cost': cost,
-                'operation': operation,
-                'details': details,
-            })
+        if not force and not self.wants_frame(cost):
+            return
+
+        if len(self.frames) >= self.max_frames:
+            # Halve the interior frames, keeping the first and the last one
+            self.frames = self.frames[:1] + self.frames[2:-1:2] + self.frames[-1:]
+
+        self.frames.append({
+            'solution': [route[:] for route in solution],
+            'cost': cost,
+            'operation': operation,
+            'details': details,
+        })
 
     def create_animation(self, filename=DEFAULT_ANIMATION_FILENAME, fps=DEFAULT_FPS):
         """
         Render and save the animation as an MP4 video.
 
+        Frames are drawn on an off-screen Agg canvas and their raw RGBA
+        pixels are piped straight into an ffmpeg subprocess. A pyplot
+        window is only opened as a fallback when the video cannot be written.
+
         Parameters
         ----------
         filename : output file path
@@ -53,7 +96,8 @@ class VNSAnimationRecorder:
 
         Returns
         -------
-        FuncAnimation object (keep a reference to prevent garbage collection).
+        FuncAnimation object when falling back to on-screen display
+        (keep a reference to prevent garbage collection), otherwise None.
         """
         n_frames = len(self.frames)
         print(f"\nCreating animation with {n_frames} improvement frames...")
@@ -62,69 +106,116 @@ class VNSAnimationRecorder:
             print("Not enough frames to animate (need at least 2).")
             return None
 
-        fig, ax = plt.subplots(figsize=(14, 10))
-        colors = plt.cm.tab20.colors
+        fig = Figure(figsize=(14, 10), facecolor='white')
+        canvas = FigureCanvasAgg(fig)
+        fig.set_layout_engine(None)
+        update = self._init_frame_artists(fig)
+        width, height = canvas.get_width_height()
+
+        cmd = [
+            matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-vcodec', 'rawvideo',
+            '-s', f'{width}x{height}', '-pix_fmt', 'rgba', '-r', str(fps),
+            '-i', '-',
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',  # yuv420p needs even sizes
+            '-c:v', 'libx264', *FFMPEG_EXTRA_ARGS,
+            filename,
+        ]
+
+        proc = None
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, bufsize=1 << 20)
+            for frame_idx in range(n_frames):
+                update(frame_idx)
+                canvas.draw()
+                proc.stdin.write(canvas.buffer_rgba())
+            proc.stdin.close()
+            if proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg exited with status {proc.returncode}")
+            print(f"✓ Animation saved as {filename}")
+            return None
+        except Exception as e:
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+            print(f"✗ Could not save video (ffmpeg may not be installed): {e}")
+            print("  Displaying animation instead...")
+            fig = plt.figure(figsize=(14, 10))
+            anim = FuncAnimation(fig, self._init_frame_artists(fig), frames=n_frames,
+                                 interval=1000 / fps, repeat=True, blit=True)
+            plt.show()
+            return anim
+
+    def _init_frame_artists(self, fig):
+        """
+        Draw the static layers on `fig` and return the per-frame callback.
+
+        Depot and customers are drawn once; the callback only updates the
+        route lines and texts in place and returns them for blitting.
+        """
+        coords = self.coords
+        n_frames = len(self.frames)
+        ax = fig.add_subplot()
+
+        # Static layer: depot and customers are drawn once for all frames
+        ax.scatter(
+            coords[0, 0], coords[0, 1],
+            c="red", marker="s", s=400, label="Depot",
+            zorder=3, edgecolors='black', linewidths=3,
+        )
+        ax.scatter(
+            coords[1:, 0], coords[1:, 1],
+            c="lightblue", s=100, zorder=2,
+            edgecolors='black', linewidths=1.5,
+        )
+
+        ax.set_xlabel("X coordinate", fontsize=12)
+        ax.set_ylabel("Y coordinate", fontsize=12)
+        ax.grid(True, alpha=0.3, linestyle='--')
+
+        # Fixed limits so that frames never trigger an autoscale
+        lo, hi = coords.min(axis=0), coords.max(axis=0)
+        margin = 0.05 * np.maximum(hi - lo, 1.0)
+        ax.set_xlim(lo[0] - margin[0], hi[0] + margin[0])
+        ax.set_ylim(lo[1] - margin[1], hi[1] + margin[1])
+        ax.set_aspect('equal', adjustable='box')
+        ax.set_autoscale_on(False)
+
+        title = ax.set_title("", fontsize=14, fontweight='bold', pad=20)
+        details_text = ax.text(
+            0.02, 0.98, "", transform=ax.transAxes,
+            fontsize=10, verticalalignment='top',
+            bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.8),
+        )
+
+        # Dynamic layer: a pool of route lines, one per route of the largest
+        # frame, created once; route i always uses line i (and its color)
+        max_routes = max(len(frame['solution']) for frame in self.frames)
+        route_lines = [
+            ax.plot([], [], color=ROUTE_COLORS[i % len(ROUTE_COLORS)],
+                    linewidth=3, alpha=0.7)[0]
+            for i in range(max_routes)
+        ]
 
         def update(frame_idx):
-            ax.clear()
             frame = self.frames[frame_idx]
             solution = frame['solution']
             cost = frame['cost']
             operation = frame['operation']
             details = frame['details']
 
-            # Depot
-            ax.scatter(
-                self.coords[0][0], self.coords[0][1],
-                c="red", marker="s", s=400, label="Depot",
-                zorder=3, edgecolors='black', linewidths=3,
-            )
+            for line, route in zip(route_lines, solution):
+                line.set_data(coords[route, 0], coords[route, 1])
+            for line in route_lines[len(solution):]:
+                line.set_data([], [])
 
-            # Customers
-            for i in range(1, len(self.coords)):
-                ax.scatter(
-                    self.coords[i][0], self.coords[i][1],
-                    c="lightblue", s=100, zorder=2,
-                    edgecolors='black', linewidths=1.5,
-                )
-
-            # Routes
-            for i, route in enumerate(solution):
-                xs = [self.coords[c][0] for c in route]
-                ys = [self.coords[c][1] for c in route]
-                ax.plot(xs, ys, color=colors[i % len(colors)],
-                        linewidth=3, alpha=0.7)
-
-            title = (
+            title.set_text(
                 f"VNS for CVRP — Improvement {frame_idx + 1}/{n_frames}\n"
                 f"Operation: {operation}\n"
                 f"Cost: {cost:.2f} | Routes: {len(solution)}"
             )
-            ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
-
-            if details:
-                ax.text(
-                    0.02, 0.98, details, transform=ax.transAxes,
-                    fontsize=10, verticalalignment='top',
-                    bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.8),
-                )
-
-            ax.set_xlabel("X coordinate", fontsize=12)
-            ax.set_ylabel("Y coordinate", fontsize=12)
-            ax.grid(True, alpha=0.3, linestyle='--')
-            ax.axis('equal')
+            details_text.set_text(details)
+            details_text.set_visible(bool(details))
 
-        anim = FuncAnimation(fig, update, frames=n_frames,
-                             interval=1000 / fps, repeat=True)
-
-        try:
-            writer = FFMpegWriter(fps=fps, bitrate=1800)
-            anim.save(filename, writer=writer)
-            print(f"✓ Animation saved as {filename}")
-            plt.close(fig)
-        except Exception as e:
-            print(f"✗ Could not save video (ffmpeg may not be installed): {e}")
-            print("  Displaying animation instead...")
-            plt.show()
+            return [*route_lines, title, details_text]
 
-        return anim
+        return update
@@ -11,60 +11,101 @@ Available methods:
 """
 
 import random
-from src.utils import route_demand
+from collections import deque
 
+import numpy as np
 
-def savings_algorithm(coords, demands, capacity, dist):
+from src._kernels import (
+    NUMBA_AVAILABLE,
+    nn_kernel,
+    cheapest_insertion_kernel,
+    unflatten_routes,
+)
+
+
+def _as_arrays(dist, demands):
+    """Return `dist` as a contiguous float64 matrix and `demands` as int64."""
+    return (np.ascontiguousarray(dist, dtype=np.float64),
+            np.asarray(demands, dtype=np.int64))
+
+
+def savings_algorithm(coords, demands, capacity, dist, noise=0.0, seed=None):
     """
     Clarke-Wright savings algorithm.
     Reference: https://web.mit.edu/urban_or_book/www/book/chapter6/6.4.12.html
 
     Builds routes by merging single-customer routes based on a savings score
     s(i,j) = d(0,i) + d(0,j) - d(i,j), prioritizing the largest savings.
+
+    If `noise` > 0, Gaussian noise with standard deviation `noise` times the
+    mean depot distance is added to the savings before sorting, which
+    randomizes the merge order (used for multi-start construction).
     """
+    dist, demands = _as_arrays(dist, demands)
     n = len(demands)
-    routes = [[0, i, 0] for i in range(1, n)]
-
-    savings = []
+    routes = {}
+    loads = {}
+    # Only route endpoints can take part in a merge, so index them directly
+    endpoints = {}
     for i in range(1, n):
-        for j in range(i + 1, n):
-            s = dist[0][i] + dist[0][j] - dist[i][j]
-            savings.append((s, i, j))
-
-    savings.sort(reverse=True)
+        route = [0, i, 0]
+        routes[id(route)] = route
+        loads[id(route)] = demands[i]
+        endpoints[i] = route
+
+    # Savings for all customer pairs 0 < i < j, computed on the packed upper
+    # triangle of `dist` and sorted in descending order (ties broken on the
+    # larger pair first, as a reverse tuple sort would). Pairs with
+    # non-positive savings cannot reduce the cost and are dropped.
+    d0 = dist[0]
+    iu, ju = np.triu_indices(n - 1, k=1)
+    iu += 1
+    ju += 1
+    savings = d0[iu] + d0[ju] - dist[iu, ju]
+    if noise > 0:
+        savings += np.random.default_rng(seed).normal(0.0, noise * d0.mean(), savings.shape)
+    mask = savings > 0
+    iu, ju = iu[mask], ju[mask]
+    order = np.argsort(savings[mask], kind='stable')[::-1]
+
+    for i, j in zip(iu[order].tolist(), ju[order].tolist()):
+        route_i = endpoints.get(i)
+        route_j = endpoints.get(j)
+
+        if route_i is None or route_j is None or route_i is route_j:
+            continue
 
-    for _, i, j in savings:
-        route_i = route_j = None
-        for r in routes:
-            if i in r:
-                route_i = r
-            if j in r:
-                route_j = r
+        load = loads[id(route_i)] + loads[id(route_j)]
+        if load <= capacity:
+            i_last = route_i[-2] == i
+            j_last = route_j[-2] == j
+            i_first = route_i[1] == i
+            j_first = route_j[1] == j
+
+            if i_last and j_first:
+                new_route = route_i[:-1] + route_j[1:]
+            elif i_first and j_last:
+                new_route = route_j[:-1] + route_i[1:]
+            elif i_last and j_last:
+                new_route = route_i[:-1] + route_j[-2:0:-1] + [0]
+            elif i_first and j_first:
+                new_route = [0] + route_i[-2:0:-1] + route_j[1:]
+            else:
+                continue
 
-        if not route_i or not route_j or route_i == route_j:
-            continue
+            del routes[id(route_i)]
+            del routes[id(route_j)]
+            del loads[id(route_i)]
+            del loads[id(route_j)]
+            routes[id(new_route)] = new_route
+            loads[id(new_route)] = load
 
-        pos_i = route_i.index(i)
-        pos_j = route_j.index(j)
-
-        if (pos_i in (1, len(route_i) - 2)) and (pos_j in (1, len(route_j) - 2)):
-            if route_demand(route_i, demands) + route_demand(route_j, demands) <= capacity:
-                if pos_i == len(route_i) - 2 and pos_j == 1:
-                    new_route = route_i[:-1] + route_j[1:]
-                elif pos_i == 1 and pos_j == len(route_j) - 2:
-                    new_route = route_j[:-1] + route_i[1:]
-                elif pos_i == len(route_i) - 2 and pos_j == len(route_j) - 2:
-                    new_route = route_i[:-1] + route_j[-2:0:-1] + [0]
-                elif pos_i == 1 and pos_j == 1:
-                    new_route = [0] + route_i[-2:0:-1] + route_j[1:]
-                else:
-                    continue
-
-                routes.remove(route_i)
-                routes.remove(route_j)
-                routes.append(new_route)
+            del endpoints[i]
+            del endpoints[j]
+            endpoints[new_route[1]] = new_route
+            endpoints[new_route[-2]] = new_route
 
-    return routes
+    return list(routes.values())
 
 
 def nearest_neighbor_vrp(coords, demands, capacity, dist):
@@ -75,37 +116,42 @@ def nearest_neighbor_vrp(coords, demands, capacity, dist):
     unvisited customer, starting from the depot, until vehicle capacity
     is reached, then opens a new route.
     """
+    dist, demands = _as_arrays(dist, demands)
+
+    if NUMBA_AVAILABLE:
+        return unflatten_routes(nn_kernel(dist, demands, capacity))
+
     n = len(coords)
-    unvisited = set(range(1, n))
+    unv_mask = np.ones(n, dtype=bool)
+    unv_mask[0] = False
     routes = []
 
-    while unvisited:
+    while unv_mask.any():
         route = [0]
         current = 0
         route_load = 0
 
-        while unvisited:
-            best_dist = float('inf')
-            best_customer = None
-
-            for customer in unvisited:
-                if route_load + demands[customer] <= capacity:
-                    d = dist[current][customer]
-                    if d < best_dist:
-                        best_dist = d
-                        best_customer = customer
-
-            if best_customer is None:
+        while True:
+            # Nearest feasible unvisited customer; argmin breaks ties on
+            # the lowest index
+            candidates = unv_mask & (route_load + demands <= capacity)
+            if not candidates.any():
                 break
 
+            row = np.where(candidates, dist[current], np.inf)
+            best_customer = int(row.argmin())
+
             route.append(best_customer)
             current = best_customer
             route_load += demands[best_customer]
-            unvisited.remove(best_customer)
+            unv_mask[best_customer] = False
+
+        if len(route) == 1:
+            # Remaining customers exceed the vehicle capacity on their own
+            break
 
-        if len(route) > 1:
-            route.append(0)
-            routes.append(route)
+        route.append(0)
+        routes.append(route)
 
     return routes
 
@@ -118,13 +164,13 @@ def greedy_vrp(coords, demands, capacity, dist):
     route fragments by connecting endpoints, while respecting
     degree and vehicle capacity constraints.
     """
+    dist, demands = _as_arrays(dist, demands)
     n = len(coords)
 
-    edges = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            edges.append((dist[i][j], i, j))
-    edges.sort()
+    # All edges i < j by increasing length; the stable sort keeps (i, j)
+    # lexicographic order among ties, as sorting (d, i, j) tuples would.
+    iu, ju = np.triu_indices(n, k=1)
+    order = np.argsort(dist[iu, ju], kind='stable')
 
     connections = {i: [] for i in range(n)}
     customer_degree = {i: 0 for i in range(1, n)}
@@ -133,7 +179,7 @@ def greedy_vrp(coords, demands, capacity, dist):
     fragments = []
     fragment_loads = []
 
-    for cost, i, j in edges:
+    for i, j in zip(iu[order].tolist(), ju[order].tolist()):
         if i != 0 and customer_degree[i] >= 2:
             continue
         if j != 0 and customer_degree[j] >= 2:
@@ -147,7 +193,7 @@ def greedy_vrp(coords, demands, capacity, dist):
                 customer = j if i == 0 else i
                 if demands[customer] <= capacity:
                     frag_idx = len(fragments)
-                    fragments.append([i, j])
+                    fragments.append(deque([i, j]))
                     fragment_loads.append(demands[customer])
                     if customer != 0:
                         customer_to_fragment[customer] = frag_idx
@@ -160,7 +206,7 @@ def greedy_vrp(coords, demands, capacity, dist):
             else:
                 if demands[i] + demands[j] <= capacity:
                     frag_idx = len(fragments)
-                    fragments.append([i, j])
+                    fragments.append(deque([i, j]))
                     fragment_loads.append(demands[i] + demands[j])
                     customer_to_fragment[i] = frag_idx
                     customer_to_fragment[j] = frag_idx
@@ -176,7 +222,7 @@ def greedy_vrp(coords, demands, capacity, dist):
             if new_load <= capacity:
                 if i == fragment[0] or i == fragment[-1]:
                     if i == fragment[0]:
-                        fragment.insert(0, j)
+                        fragment.appendleft(j)
                     else:
                         fragment.append(j)
                     connections[i].append(j)
@@ -195,7 +241,7 @@ def greedy_vrp(coords, demands, capacity, dist):
             if new_load <= capacity:
                 if j == fragment[0] or j == fragment[-1]:
                     if j == fragment[0]:
-                        fragment.insert(0, i)
+                        fragment.appendleft(i)
                     else:
                         fragment.append(i)
                     connections[i].append(j)
@@ -218,19 +264,23 @@ def greedy_vrp(coords, demands, capacity, dist):
 
                 if i_at_end and j_at_end:
                     if i == frag1[-1] and j == frag2[0]:
-                        merged = frag1 + frag2
+                        merged = frag1
+                        merged.extend(frag2)
                     elif i == frag1[0] and j == frag2[-1]:
-                        merged = frag2 + frag1
+                        merged = frag1
+                        merged.extendleft(reversed(frag2))
                     elif i == frag1[-1] and j == frag2[-1]:
-                        merged = frag1 + frag2[::-1]
+                        merged = frag1
+                        merged.extend(reversed(frag2))
                     elif i == frag1[0] and j == frag2[0]:
-                        merged = frag1[::-1] + frag2
+                        merged = deque(reversed(frag1))
+                        merged.extend(frag2)
                     else:
                         continue
 
                     fragments[frag_i] = merged
                     fragment_loads[frag_i] = new_load
-                    fragments[frag_j] = []
+                    fragments[frag_j] = deque()
                     fragment_loads[frag_j] = 0
 
                     for customer in frag2:
@@ -249,11 +299,11 @@ def greedy_vrp(coords, demands, capacity, dist):
         if not fragment:
             continue
         if fragment[0] != 0:
-            fragment.insert(0, 0)
+            fragment.appendleft(0)
         if fragment[-1] != 0:
             fragment.append(0)
         if len(fragment) > 2:
-            routes.append(fragment)
+            routes.append(list(fragment))
 
     for customer in range(1, n):
         if customer not in customer_to_fragment:
@@ -271,45 +321,60 @@ def cheapest_insertion_vrp(coords, demands, capacity, dist):
     whose insertion causes the minimum increase in total route cost,
     subject to vehicle capacity constraints.
     """
+    dist, demands = _as_arrays(dist, demands)
     n = len(coords)
-    unvisited = set(range(1, n))
+    unv_mask = np.ones(n, dtype=bool)
+    unv_mask[0] = False
+
+    farthest = int(np.where(unv_mask, dist[0], -1.0).argmax())
+
+    if NUMBA_AVAILABLE:
+        return unflatten_routes(
+            cheapest_insertion_kernel(dist, demands, capacity, farthest))
 
-    farthest = max(unvisited, key=lambda c: dist[0][c])
     routes = [[0, farthest, 0]]
     route_loads = [demands[farthest]]
-    unvisited.remove(farthest)
-
-    while unvisited:
-        best_cost_increase = float('inf')
-        best_customer = None
-        best_route = None
-        best_position = None
-
-        for customer in unvisited:
-            for r_idx, route in enumerate(routes):
-                if route_loads[r_idx] + demands[customer] > capacity:
-                    continue
-
-                for pos in range(1, len(route)):
-                    increase = (dist[route[pos - 1]][customer] +
-                                dist[customer][route[pos]] -
-                                dist[route[pos - 1]][route[pos]])
-
-                    if increase < best_cost_increase:
-                        best_cost_increase = increase
-                        best_customer = customer
-                        best_route = r_idx
-                        best_position = pos
-
-        if best_customer is None:
-            customer = unvisited.pop()
+    unv_mask[farthest] = False
+
+    while unv_mask.any():
+        unv = np.flatnonzero(unv_mask)
+
+        # Routes with room for at least the lightest unvisited customer
+        min_demand = demands[unv].min()
+        open_routes = [r_idx for r_idx, load in enumerate(route_loads)
+                       if load + min_demand <= capacity]
+
+        if not open_routes:
+            increase = None
+        else:
+            # Every insertion slot (route edge) of every open route, in route
+            # order, so the flat argmin breaks ties by customer, route, position.
+            prev = np.concatenate([routes[r][:-1] for r in open_routes])
+            nxt = np.concatenate([routes[r][1:] for r in open_routes])
+            slot_route = np.repeat(open_routes,
+                                   [len(routes[r]) - 1 for r in open_routes])
+            slot_pos = np.concatenate([np.arange(1, len(routes[r])) for r in open_routes])
+            slot_load = np.asarray(route_loads)[slot_route]
+
+            increase = (dist[np.ix_(unv, prev)] + dist[np.ix_(unv, nxt)] -
+                        dist[prev, nxt][None, :])
+            increase[demands[unv][:, None] + slot_load[None, :] > capacity] = np.inf
+
+            best = int(increase.argmin())
+            u_idx, s_idx = divmod(best, increase.shape[1])
+
+        if increase is None or increase[u_idx, s_idx] == np.inf:
+            customer = int(unv[0])
+            unv_mask[customer] = False
             if demands[customer] <= capacity:
                 routes.append([0, customer, 0])
                 route_loads.append(demands[customer])
         else:
-            routes[best_route].insert(best_position, best_customer)
+            best_customer = int(unv[u_idx])
+            best_route = int(slot_route[s_idx])
+            routes[best_route].insert(int(slot_pos[s_idx]), best_customer)
             route_loads[best_route] += demands[best_customer]
-            unvisited.remove(best_customer)
+            unv_mask[best_customer] = False
 
     return routes
 
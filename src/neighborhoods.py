@@ -9,133 +9,308 @@ Neighborhoods:
 - N4: 2-opt between routes (inter-route)
 - N5: Merge routes
 - N6: Or-opt (optional, expensive)
+
+Each neighborhood returns (new_solution, delta), where delta is the total
+cost change of the moves it applied (0.0 if none).
+
+Distances are read with dist.item(i, j), which returns a Python float, so
+move deltas are summed in float64 whatever the matrix dtype. With a
+float32 matrix, float32 sums would carry rounding of the order of
+IMPROVEMENT_THRESHOLD on large coordinates, and a move and its reverse
+could both look improving.
 """
 
-from src.utils import route_cost, solution_cost, route_demand
+from src.utils import solution_cost, route_demand, route_prefix_demand
+from src._kernels import (
+    NUMBA_AVAILABLE,
+    flatten_solution,
+    split_solution,
+    two_opt_intra_routes,
+)
 from config import IMPROVEMENT_THRESHOLD
 
 
+def _index_routes(sol, n):
+    """Map each customer to its route index and position within that route."""
+    route_of = [-1] * n
+    pos_of = [0] * n
+    for r_idx in range(len(sol)):
+        _touch_route(sol, r_idx, route_of, pos_of)
+    return route_of, pos_of
+
+
+def _touch_route(sol, r_idx, route_of, pos_of, start=1):
+    """Re-sync the index entries of sol[r_idx] from position `start` onwards."""
+    route = sol[r_idx]
+    for pos in range(start, len(route) - 1):
+        route_of[route[pos]] = r_idx
+        pos_of[route[pos]] = pos
+
+
 def N1_two_opt_intra(solution, dist):
-    """N1: 2-opt within each route. Reverses segments to reduce intra-route cost."""
+    """
+    N1: 2-opt within each route. Reverses segments to reduce intra-route cost.
+
+    Each route is improved on its own: every pass applies the best segment
+    reversal of the route, until none improves it.
+    """
+    if NUMBA_AVAILABLE:
+        # All routes are improved in one kernel call on the flattened solution
+        nodes, bounds = flatten_solution(solution)
+        total_delta = two_opt_intra_routes(nodes, bounds, dist, IMPROVEMENT_THRESHOLD)
+        return split_solution(nodes, bounds), total_delta
+
     best_sol = [r[:] for r in solution]
-    improved = True
+    total_delta = 0.0
 
-    while improved:
-        improved = False
-        for r_idx, route in enumerate(best_sol):
-            if len(route) <= 3:
-                continue
+    # Same search as the kernel: repeated best-improvement passes per route
+    for route in best_sol:
+        if len(route) <= 3:
+            continue
+
+        while True:
+            best_delta = -IMPROVEMENT_THRESHOLD
+            best_move = None
 
             for i in range(1, len(route) - 2):
+                a, b = route[i - 1], route[i]
+                d_ab = dist.item(a, b)
                 for j in range(i + 1, len(route) - 1):
-                    delta = (dist[route[i - 1]][route[j]] +
-                             dist[route[i]][route[j + 1]] -
-                             dist[route[i - 1]][route[i]] -
-                             dist[route[j]][route[j + 1]])
-
-                    if delta < -IMPROVEMENT_THRESHOLD:
-                        best_sol[r_idx] = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
-                        improved = True
-                        break
-                if improved:
-                    break
-            if improved:
+                    c, d = route[j], route[j + 1]
+                    delta = dist.item(a, c) + dist.item(b, d) - d_ab - dist.item(c, d)
+
+                    if delta < best_delta:
+                        best_delta = delta
+                        best_move = (i, j)
+
+            if best_move is None:
                 break
 
-    return best_sol
+            # Reverse route[i..j] in place
+            i, j = best_move
+            while i < j:
+                route[i], route[j] = route[j], route[i]
+                i += 1
+                j -= 1
+            total_delta += best_delta
+
+    return best_sol, total_delta
 
 
-def N2_relocate_inter(solution, demands, capacity, dist):
-    """N2: Move a single customer from one route to another at the best insertion position."""
+def N2_relocate_inter(solution, demands, capacity, dist, neighbors=None):
+    """
+    N2: Move a single customer from one route to another at the best insertion position.
+
+    With `neighbors` (see utils.compute_neighbors), a customer is only
+    inserted right before or after one of its nearest customers.
+
+    A customer without any improving relocation gets a don't-look bit and
+    is skipped until an applied move changes its route.
+    """
     sol = [r[:] for r in solution]
+    loads = [route_demand(r, demands) for r in sol]
+    if neighbors is not None:
+        route_of, pos_of = _index_routes(sol, len(neighbors))
+
+    dont_look = [False] * len(demands)
 
+    total_delta = 0.0
     improved = True
     while improved:
         improved = False
         best_delta = -IMPROVEMENT_THRESHOLD
         best_move = None
 
-        for r1_idx in range(len(sol)):
-            if len(sol[r1_idx]) <= 2:
+        n_routes = len(sol)
+        for r1_idx in range(n_routes):
+            r1 = sol[r1_idx]
+            len1 = len(r1)
+            if len1 <= 2:
                 continue
 
-            for c_idx in range(1, len(sol[r1_idx]) - 1):
-                customer = sol[r1_idx][c_idx]
+            for c_idx in range(1, len1 - 1):
+                customer = r1[c_idx]
+                if dont_look[customer]:
+                    continue
+
+                c_best_delta = -IMPROVEMENT_THRESHOLD
+                c_best_move = None
+
+                prev, nxt = r1[c_idx - 1], r1[c_idx + 1]
+                removal_delta = (dist.item(prev, nxt) -
+                                 dist.item(prev, customer) -
+                                 dist.item(customer, nxt))
+                demand = demands[customer]
+
+                if neighbors is not None:
+                    for nb in neighbors[customer]:
+                        r2_idx = route_of[nb]
+                        if r2_idx == r1_idx or r2_idx < 0:
+                            continue
+                        if loads[r2_idx] + demand > capacity:
+                            continue
+
+                        r2 = sol[r2_idx]
+                        for pos in (pos_of[nb], pos_of[nb] + 1):
+                            a, b = r2[pos - 1], r2[pos]
+                            insert_delta = (dist.item(a, customer) + dist.item(customer, b) -
+                                            dist.item(a, b))
 
-                removal_delta = (dist[sol[r1_idx][c_idx - 1]][sol[r1_idx][c_idx + 1]] -
-                                 dist[sol[r1_idx][c_idx - 1]][customer] -
-                                 dist[customer][sol[r1_idx][c_idx + 1]])
+                            move_delta = removal_delta + insert_delta
 
-                for r2_idx in range(len(sol)):
-                    if r1_idx == r2_idx:
-                        continue
-                    if route_demand(sol[r2_idx], demands) + demands[customer] > capacity:
-                        continue
+                            if move_delta < c_best_delta:
+                                c_best_delta = move_delta
+                                c_best_move = (r1_idx, c_idx, r2_idx, pos)
+                else:
+                    for r2_idx in range(n_routes):
+                        if r1_idx == r2_idx:
+                            continue
+                        if loads[r2_idx] + demand > capacity:
+                            continue
 
-                    for pos in range(1, len(sol[r2_idx])):
-                        insert_delta = (dist[sol[r2_idx][pos - 1]][customer] +
-                                        dist[customer][sol[r2_idx][pos]] -
-                                        dist[sol[r2_idx][pos - 1]][sol[r2_idx][pos]])
+                        r2 = sol[r2_idx]
+                        for pos in range(1, len(r2)):
+                            a, b = r2[pos - 1], r2[pos]
+                            insert_delta = (dist.item(a, customer) + dist.item(customer, b) -
+                                            dist.item(a, b))
 
-                        total_delta = removal_delta + insert_delta
+                            move_delta = removal_delta + insert_delta
 
-                        if total_delta < best_delta:
-                            best_delta = total_delta
-                            best_move = (r1_idx, c_idx, r2_idx, pos)
+                            if move_delta < c_best_delta:
+                                c_best_delta = move_delta
+                                c_best_move = (r1_idx, c_idx, r2_idx, pos)
+
+                if c_best_move is None:
+                    dont_look[customer] = True
+                elif c_best_delta < best_delta:
+                    best_delta = c_best_delta
+                    best_move = c_best_move
 
         if best_move:
             r1_idx, c_idx, r2_idx, pos = best_move
             customer = sol[r1_idx][c_idx]
             sol[r1_idx].pop(c_idx)
             sol[r2_idx].insert(pos, customer)
-            sol = [r for r in sol if len(r) > 2]
+            loads[r1_idx] -= demands[customer]
+            loads[r2_idx] += demands[customer]
+            for c in sol[r1_idx] + sol[r2_idx]:
+                dont_look[c] = False
+            if len(sol[r1_idx]) <= 2:
+                # The source route is now empty; later route indices shift
+                del sol[r1_idx]
+                del loads[r1_idx]
+                if neighbors is not None:
+                    route_of, pos_of = _index_routes(sol, len(neighbors))
+            elif neighbors is not None:
+                _touch_route(sol, r1_idx, route_of, pos_of, c_idx)
+                _touch_route(sol, r2_idx, route_of, pos_of, pos)
+            total_delta += best_delta
             improved = True
 
-    return sol
+    return sol, total_delta
+
 
+def N3_swap_inter(solution, demands, capacity, dist, neighbors=None):
+    """
+    N3: Swap one customer between two different routes.
+
+    With `neighbors` (see utils.compute_neighbors), a customer is only
+    swapped with one of its nearest customers.
 
-def N3_swap_inter(solution, demands, capacity, dist):
-    """N3: Swap one customer between two different routes."""
+    A customer without any improving swap gets a don't-look bit and is
+    skipped until an applied move changes its route.
+    """
     sol = [r[:] for r in solution]
+    loads = [route_demand(r, demands) for r in sol]
+    if neighbors is not None:
+        route_of, pos_of = _index_routes(sol, len(neighbors))
 
+    dont_look = [False] * len(demands)
+
+    total_delta = 0.0
     improved = True
     while improved:
         improved = False
         best_delta = -IMPROVEMENT_THRESHOLD
         best_move = None
 
-        for r1_idx in range(len(sol)):
-            if len(sol[r1_idx]) <= 2:
+        n_routes = len(sol)
+        for r1_idx in range(n_routes):
+            r1 = sol[r1_idx]
+            len1 = len(r1)
+            if len1 <= 2:
                 continue
 
-            for c1_idx in range(1, len(sol[r1_idx]) - 1):
-                c1 = sol[r1_idx][c1_idx]
+            for c1_idx in range(1, len1 - 1):
+                c1 = r1[c1_idx]
+                if dont_look[c1]:
+                    continue
 
-                for r2_idx in range(r1_idx + 1, len(sol)):
-                    if len(sol[r2_idx]) <= 2:
-                        continue
+                c_best_delta = -IMPROVEMENT_THRESHOLD
+                c_best_move = None
 
-                    for c2_idx in range(1, len(sol[r2_idx]) - 1):
-                        c2 = sol[r2_idx][c2_idx]
+                # Neighbours of c1 and the cost of c1's current edges
+                p1, n1 = r1[c1_idx - 1], r1[c1_idx + 1]
+                old1 = dist.item(p1, c1) + dist.item(c1, n1)
+                base1 = loads[r1_idx] - demands[c1]
 
-                        load1 = route_demand(sol[r1_idx], demands) - demands[c1] + demands[c2]
-                        load2 = route_demand(sol[r2_idx], demands) - demands[c2] + demands[c1]
+                if neighbors is not None:
+                    for c2 in neighbors[c1]:
+                        r2_idx = route_of[c2]
+                        if r2_idx == r1_idx or r2_idx < 0:
+                            continue
+
+                        load1 = base1 + demands[c2]
+                        load2 = loads[r2_idx] - demands[c2] + demands[c1]
 
                         if load1 > capacity or load2 > capacity:
                             continue
 
-                        delta = (dist[sol[r1_idx][c1_idx - 1]][c2] +
-                                 dist[c2][sol[r1_idx][c1_idx + 1]] +
-                                 dist[sol[r2_idx][c2_idx - 1]][c1] +
-                                 dist[c1][sol[r2_idx][c2_idx + 1]] -
-                                 dist[sol[r1_idx][c1_idx - 1]][c1] -
-                                 dist[c1][sol[r1_idx][c1_idx + 1]] -
-                                 dist[sol[r2_idx][c2_idx - 1]][c2] -
-                                 dist[c2][sol[r2_idx][c2_idx + 1]])
+                        r2 = sol[r2_idx]
+                        c2_idx = pos_of[c2]
+                        p2, n2 = r2[c2_idx - 1], r2[c2_idx + 1]
+                        delta = (dist.item(p1, c2) + dist.item(c2, n1) +
+                                 dist.item(p2, c1) + dist.item(c1, n2) -
+                                 old1 -
+                                 dist.item(p2, c2) - dist.item(c2, n2))
+
+                        if delta < c_best_delta:
+                            c_best_delta = delta
+                            c_best_move = (r1_idx, c1_idx, r2_idx, c2_idx)
+                else:
+                    # Every other route, not only later ones: c1 may be the
+                    # only side of a swap whose don't-look bit is clear
+                    for r2_idx in range(n_routes):
+                        r2 = sol[r2_idx]
+                        len2 = len(r2)
+                        if r2_idx == r1_idx or len2 <= 2:
+                            continue
+                        base2 = loads[r2_idx] + demands[c1]
 
-                        if delta < best_delta:
-                            best_delta = delta
-                            best_move = (r1_idx, c1_idx, r2_idx, c2_idx)
+                        for c2_idx in range(1, len2 - 1):
+                            c2 = r2[c2_idx]
+
+                            load1 = base1 + demands[c2]
+                            load2 = base2 - demands[c2]
+
+                            if load1 > capacity or load2 > capacity:
+                                continue
+
+                            p2, n2 = r2[c2_idx - 1], r2[c2_idx + 1]
+                            delta = (dist.item(p1, c2) + dist.item(c2, n1) +
+                                     dist.item(p2, c1) + dist.item(c1, n2) -
+                                     old1 -
+                                     dist.item(p2, c2) - dist.item(c2, n2))
+
+                            if delta < c_best_delta:
+                                c_best_delta = delta
+                                c_best_move = (r1_idx, c1_idx, r2_idx, c2_idx)
+
+                if c_best_move is None:
+                    dont_look[c1] = True
+                elif c_best_delta < best_delta:
+                    best_delta = c_best_delta
+                    best_move = c_best_move
 
         if best_move:
             r1_idx, c1_idx, r2_idx, c2_idx = best_move
@@ -143,59 +318,93 @@ def N3_swap_inter(solution, demands, capacity, dist):
             c2 = sol[r2_idx][c2_idx]
             sol[r1_idx][c1_idx] = c2
             sol[r2_idx][c2_idx] = c1
+            loads[r1_idx] += demands[c2] - demands[c1]
+            loads[r2_idx] += demands[c1] - demands[c2]
+            for c in sol[r1_idx] + sol[r2_idx]:
+                dont_look[c] = False
+            if neighbors is not None:
+                route_of[c1], route_of[c2] = r2_idx, r1_idx
+                pos_of[c1], pos_of[c2] = c2_idx, c1_idx
+            total_delta += best_delta
             improved = True
 
-    return sol
+    return sol, total_delta
 
 
 def N4_two_opt_inter(solution, demands, capacity, dist):
-    """N4: 2-opt between two routes — exchange route tails."""
-    best_sol = [r[:] for r in solution]
+    """
+    N4: 2-opt between two routes — exchange route tails.
+
+    Only two edges change per exchange, so each candidate is evaluated by
+    its edge delta; capacity is only checked for improving candidates, in
+    O(1) from the per-route prefix demands, and the two new routes are
+    built once for the best move of each sweep.
+    """
+    sol = [r[:] for r in solution]
+    prefix = [route_prefix_demand(r, demands) for r in sol]
+    total_delta = 0.0
     improved = True
 
     while improved:
         improved = False
+        best_delta = -IMPROVEMENT_THRESHOLD
+        best_move = None
 
-        for r1_idx in range(len(best_sol)):
-            if len(best_sol[r1_idx]) <= 2:
+        for r1_idx in range(len(sol)):
+            r1 = sol[r1_idx]
+            if len(r1) <= 2:
                 continue
+            p1 = prefix[r1_idx]
+            load_r1 = p1[-1]
 
-            for r2_idx in range(r1_idx + 1, len(best_sol)):
-                if len(best_sol[r2_idx]) <= 2:
+            for r2_idx in range(r1_idx + 1, len(sol)):
+                r2 = sol[r2_idx]
+                if len(r2) <= 2:
                     continue
+                p2 = prefix[r2_idx]
+                load_r2 = p2[-1]
 
-                for i in range(1, len(best_sol[r1_idx]) - 1):
-                    for j in range(1, len(best_sol[r2_idx]) - 1):
-                        new_r1 = best_sol[r1_idx][:i + 1] + best_sol[r2_idx][j + 1:]
-                        new_r2 = best_sol[r2_idx][:j + 1] + best_sol[r1_idx][i + 1:]
-
-                        if (route_demand(new_r1, demands) <= capacity and
-                                route_demand(new_r2, demands) <= capacity):
-
-                            old_cost = (route_cost(best_sol[r1_idx], dist) +
-                                        route_cost(best_sol[r2_idx], dist))
-                            new_cost = route_cost(new_r1, dist) + route_cost(new_r2, dist)
-
-                            if new_cost < old_cost - IMPROVEMENT_THRESHOLD:
-                                new_sol = [r[:] for r in best_sol]
-                                new_sol[r1_idx] = new_r1
-                                new_sol[r2_idx] = new_r2
-                                best_sol = new_sol
-                                improved = True
-                                break
-                    if improved:
-                        break
-                if improved:
-                    break
-            if improved:
-                break
+                for i in range(1, len(r1) - 1):
+                    for j in range(1, len(r2) - 1):
+                        delta = (dist.item(r1[i], r2[j + 1]) +
+                                 dist.item(r2[j], r1[i + 1]) -
+                                 dist.item(r1[i], r1[i + 1]) -
+                                 dist.item(r2[j], r2[j + 1]))
 
-    return best_sol
+                        if delta >= best_delta:
+                            continue
+
+                        load1 = p1[i] + load_r2 - p2[j]
+                        load2 = p2[j] + load_r1 - p1[i]
+
+                        if load1 <= capacity and load2 <= capacity:
+                            best_delta = delta
+                            best_move = (r1_idx, i, r2_idx, j)
+
+        if best_move:
+            r1_idx, i, r2_idx, j = best_move
+            r1, r2 = sol[r1_idx], sol[r2_idx]
+            sol[r1_idx] = r1[:i + 1] + r2[j + 1:]
+            sol[r2_idx] = r2[:j + 1] + r1[i + 1:]
+            prefix[r1_idx] = route_prefix_demand(sol[r1_idx], demands)
+            prefix[r2_idx] = route_prefix_demand(sol[r2_idx], demands)
+            total_delta += best_delta
+            improved = True
+
+    return sol, total_delta
 
 
 def N5_merge_routes(solution, demands, capacity, dist):
-    """N5: Merge two routes into one if capacity allows and cost improves."""
+    """
+    N5: Merge two routes into one if capacity allows and cost improves.
+
+    A merge only replaces the depot edges at the joint, so each of the four
+    configurations is scored in O(1) from the route end customers; the
+    merged route is built once, for the chosen configuration.
+    """
     sol = [r[:] for r in solution]
+    loads = [route_demand(r, demands) for r in sol]
+    total_delta = 0.0
     improved = True
 
     while improved:
@@ -204,44 +413,68 @@ def N5_merge_routes(solution, demands, capacity, dist):
         best_merge = None
 
         for r1_idx in range(len(sol)):
+            first1, last1 = sol[r1_idx][1], sol[r1_idx][-2]
+
             for r2_idx in range(r1_idx + 1, len(sol)):
-                total_demand = route_demand(sol[r1_idx], demands) + route_demand(sol[r2_idx], demands)
+                total_demand = loads[r1_idx] + loads[r2_idx]
 
                 if total_demand <= capacity:
-                    configs = [
-                        sol[r1_idx][:-1] + sol[r2_idx][1:],
-                        sol[r2_idx][:-1] + sol[r1_idx][1:],
-                        sol[r1_idx][:-1] + sol[r2_idx][-2:0:-1] + [0],
-                        sol[r2_idx][:-1] + sol[r1_idx][-2:0:-1] + [0]
-                    ]
-
-                    old_cost = route_cost(sol[r1_idx], dist) + route_cost(sol[r2_idx], dist)
-
-                    for merged in configs:
-                        new_cost = route_cost(merged, dist)
-                        delta = new_cost - old_cost
-
+                    first2, last2 = sol[r2_idx][1], sol[r2_idx][-2]
+
+                    # Distances are symmetric, so a reversed route keeps its cost
+                    deltas = (
+                        # r1 + r2
+                        dist.item(last1, first2) - dist.item(last1, 0) - dist.item(0, first2),
+                        # r2 + r1
+                        dist.item(last2, first1) - dist.item(last2, 0) - dist.item(0, first1),
+                        # r1 + reversed r2
+                        dist.item(last1, last2) - dist.item(last1, 0) - dist.item(last2, 0),
+                        # r2 + reversed r1
+                        dist.item(last2, last1) - dist.item(last2, 0) - dist.item(last1, 0),
+                    )
+
+                    for config, delta in enumerate(deltas):
                         if delta < best_delta:
                             best_delta = delta
-                            best_merge = (r1_idx, r2_idx, merged)
+                            best_merge = (r1_idx, r2_idx, config)
 
         if best_merge:
-            r1_idx, r2_idx, merged = best_merge
+            r1_idx, r2_idx, config = best_merge
+            r1, r2 = sol[r1_idx], sol[r2_idx]
+            merged = [
+                r1[:-1] + r2[1:],
+                r2[:-1] + r1[1:],
+                r1[:-1] + r2[-2:0:-1] + [0],
+                r2[:-1] + r1[-2:0:-1] + [0],
+            ][config]
+            merged_load = loads[r1_idx] + loads[r2_idx]
             new_sol = [route for idx, route in enumerate(sol)
                        if idx != r1_idx and idx != r2_idx]
             new_sol.append(merged)
+            loads = [load for idx, load in enumerate(loads)
+                     if idx != r1_idx and idx != r2_idx]
+            loads.append(merged_load)
             sol = new_sol
+            total_delta += best_delta
             improved = True
 
-    return sol
+    return sol, total_delta
 
 
-def N6_or_opt(solution, demands, capacity, dist):
+def N6_or_opt(solution, demands, capacity, dist, neighbors=None):
     """
     N6: Or-opt — relocate chains of 1, 2, or 3 consecutive customers within
     or between routes. Expensive but effective. Disabled by default.
+
+    With `neighbors` (see utils.compute_neighbors), a chain is only moved to
+    another route right after a near customer of its first element or
+    right before a near customer of its last element.
     """
     sol = [r[:] for r in solution]
+    prefix = [route_prefix_demand(r, demands) for r in sol]
+    if neighbors is not None:
+        route_of, pos_of = _index_routes(sol, len(neighbors))
+    total_delta = 0.0
     improved = True
 
     while improved:
@@ -251,57 +484,74 @@ def N6_or_opt(solution, demands, capacity, dist):
 
         for chain_len in [1, 2, 3]:
             for r_idx in range(len(sol)):
-                if len(sol[r_idx]) <= chain_len + 2:
+                route = sol[r_idx]
+                length = len(route)
+                if length <= chain_len + 2:
                     continue
 
-                for start in range(1, len(sol[r_idx]) - chain_len):
-                    for insert_pos in range(1, len(sol[r_idx]) - 1):
+                for start in range(1, length - chain_len):
+                    # Chain route[start..end] between `before` and `after`
+                    end = start + chain_len - 1
+                    before, first = route[start - 1], route[start]
+                    last, after = route[end], route[end + 1]
+                    cut_cost = dist.item(before, first) + dist.item(last, after)
+                    bridge = dist.item(before, after)
+
+                    for insert_pos in range(1, length - 1):
                         if insert_pos >= start and insert_pos <= start + chain_len:
                             continue
 
-                        route = sol[r_idx]
-                        old_cost = (dist[route[start - 1]][route[start]] +
-                                    dist[route[start + chain_len - 1]][route[start + chain_len]] +
-                                    dist[route[insert_pos - 1]][route[insert_pos]])
-                        new_cost = (dist[route[start - 1]][route[start + chain_len]] +
-                                    dist[route[insert_pos - 1]][route[start]] +
-                                    dist[route[start + chain_len - 1]][route[insert_pos]])
+                        a, b = route[insert_pos - 1], route[insert_pos]
+                        old_cost = cut_cost + dist.item(a, b)
+                        new_cost = bridge + dist.item(a, first) + dist.item(last, b)
 
                         delta = new_cost - old_cost
                         if delta < best_delta:
                             best_delta = delta
                             best_move = ('intra', r_idx, start, chain_len, insert_pos)
 
-            for r1_idx in range(len(sol)):
-                if len(sol[r1_idx]) <= chain_len + 1:
+            n_routes = len(sol)
+            for r1_idx in range(n_routes):
+                r1 = sol[r1_idx]
+                len1 = len(r1)
+                if len1 <= chain_len + 1:
                     continue
-
-                for start in range(1, len(sol[r1_idx]) - chain_len):
-                    chain_demand = sum(demands[sol[r1_idx][start + i]] for i in range(chain_len))
-
-                    for r2_idx in range(len(sol)):
-                        if r1_idx == r2_idx:
+                p1 = prefix[r1_idx]
+
+                for start in range(1, len1 - chain_len):
+                    end = start + chain_len - 1
+                    chain_demand = p1[end] - p1[start - 1]
+                    first, last = r1[start], r1[end]
+                    # Cost change of cutting the chain out of r1; the chain's
+                    # internal edges are carried along and cancel out
+                    before, after = r1[start - 1], r1[end + 1]
+                    removal_cost = (dist.item(before, after) - dist.item(before, first) -
+                                    dist.item(last, after))
+
+                    if neighbors is not None:
+                        targets = ([(route_of[nb], pos_of[nb] + 1) for nb in neighbors[first]] +
+                                   [(route_of[nb], pos_of[nb]) for nb in neighbors[last]])
+                    else:
+                        targets = [(r2_idx, insert_pos)
+                                   for r2_idx in range(n_routes)
+                                   for insert_pos in range(1, len(sol[r2_idx]))]
+
+                    for r2_idx, insert_pos in targets:
+                        if r2_idx == r1_idx or r2_idx < 0:
                             continue
-                        if route_demand(sol[r2_idx], demands) + chain_demand > capacity:
+                        if prefix[r2_idx][-1] + chain_demand > capacity:
                             continue
 
-                        for insert_pos in range(1, len(sol[r2_idx])):
-                            removal_cost = (dist[sol[r1_idx][start - 1]][sol[r1_idx][start + chain_len]] -
-                                            dist[sol[r1_idx][start - 1]][sol[r1_idx][start]])
-                            for i in range(chain_len - 1):
-                                removal_cost -= dist[sol[r1_idx][start + i]][sol[r1_idx][start + i + 1]]
-                            removal_cost -= dist[sol[r1_idx][start + chain_len - 1]][sol[r1_idx][start + chain_len]]
-
-                            insert_cost = (dist[sol[r2_idx][insert_pos - 1]][sol[r1_idx][start]] +
-                                           dist[sol[r1_idx][start + chain_len - 1]][sol[r2_idx][insert_pos]] -
-                                           dist[sol[r2_idx][insert_pos - 1]][sol[r2_idx][insert_pos]])
-                            for i in range(chain_len - 1):
-                                insert_cost += dist[sol[r1_idx][start + i]][sol[r1_idx][start + i + 1]]
-
-                            delta = removal_cost + insert_cost
-                            if delta < best_delta:
-                                best_delta = delta
-                                best_move = ('inter', r1_idx, start, chain_len, r2_idx, insert_pos)
+                        r2 = sol[r2_idx]
+                        a, b = r2[insert_pos - 1], r2[insert_pos]
+                        delta = removal_cost + dist.item(a, first) - dist.item(a, b)
+                        if delta >= best_delta:
+                            # dist[last, b] >= 0 can only make it worse
+                            continue
+                        delta += dist.item(last, b)
+                        if delta < best_delta:
+                            best_delta = delta
+                            best_move = ('inter', r1_idx, start, chain_len, r2_idx, insert_pos)
 
         if best_move:
             if best_move[0] == 'intra':
@@ -312,13 +562,27 @@ def N6_or_opt(solution, demands, capacity, dist):
                     insert_pos -= chain_len
                 for i, customer in enumerate(chain):
                     sol[r_idx].insert(insert_pos + i, customer)
+                prefix[r_idx] = route_prefix_demand(sol[r_idx], demands)
+                if neighbors is not None:
+                    _touch_route(sol, r_idx, route_of, pos_of, min(start, insert_pos))
             else:
                 _, r1_idx, start, chain_len, r2_idx, insert_pos = best_move
                 chain = sol[r1_idx][start:start + chain_len]
                 del sol[r1_idx][start:start + chain_len]
                 for i, customer in enumerate(chain):
                     sol[r2_idx].insert(insert_pos + i, customer)
-                sol = [r for r in sol if len(r) > 2]
+                prefix[r1_idx] = route_prefix_demand(sol[r1_idx], demands)
+                prefix[r2_idx] = route_prefix_demand(sol[r2_idx], demands)
+                if len(sol[r1_idx]) <= 2:
+                    # The source route is now empty; later route indices shift
+                    del sol[r1_idx]
+                    del prefix[r1_idx]
+                    if neighbors is not None:
+                        route_of, pos_of = _index_routes(sol, len(neighbors))
+                elif neighbors is not None:
+                    _touch_route(sol, r1_idx, route_of, pos_of, start)
+                    _touch_route(sol, r2_idx, route_of, pos_of, insert_pos)
+            total_delta += best_delta
             improved = True
 
-    return sol
+    return sol, total_delta
@@ -5,6 +5,20 @@ Parsers for VRP instance files and solution files.
 
 import re
 
+import numpy as np
+
+
+def _section_block(lines, header):
+    """Data lines following `header`, up to the next keyword line."""
+    if header not in lines:
+        return []
+    block = []
+    for line in lines[lines.index(header) + 1:]:
+        if line[0].isalpha():
+            break
+        block.append(line)
+    return block
+
 
 def parse_vrp(filename):
     """Parse a .vrp file in TSPLIB format."""
@@ -12,38 +26,33 @@ def parse_vrp(filename):
         lines = [line.strip() for line in f if line.strip()]
 
     data = {'coords': [], 'demands': [], 'capacity': 0, 'dimension': 0}
-    section = None
 
     for line in lines:
         if line.startswith('DIMENSION'):
             data['dimension'] = int(line.split(':')[1].strip())
         elif line.startswith('CAPACITY'):
             data['capacity'] = int(line.split(':')[1].strip())
-        elif line == 'NODE_COORD_SECTION':
-            section = 'coords'
-        elif line == 'DEMAND_SECTION':
-            section = 'demands'
-        elif line == 'DEPOT_SECTION':
-            section = 'depot'
-        elif line == 'EOF':
+        elif line.endswith('_SECTION'):
             break
-        elif section == 'coords':
-            parts = line.split()
-            if len(parts) >= 3:
-                idx = int(parts[0]) - 1
-                x, y = float(parts[1]), float(parts[2])
-                while len(data['coords']) <= idx:
-                    data['coords'].append(None)
-                data['coords'][idx] = (x, y)
-        elif section == 'demands':
-            parts = line.split()
-            if len(parts) >= 2:
-                idx = int(parts[0]) - 1
-                demand = int(parts[1])
-                while len(data['demands']) <= idx:
-                    data['demands'].append(0)
-                data['demands'][idx] = demand
 
+    # Each section is parsed in one go; node ids are 1-based
+    coord_rows = np.loadtxt(_section_block(lines, 'NODE_COORD_SECTION'),
+                            dtype=np.float64, ndmin=2, usecols=(0, 1, 2))
+    demand_rows = np.loadtxt(_section_block(lines, 'DEMAND_SECTION'),
+                             dtype=np.int64, ndmin=2, usecols=(0, 1))
+
+    n = max([data['dimension']] +
+            [int(rows[:, 0].max()) for rows in (coord_rows, demand_rows) if len(rows)])
+
+    coords = np.zeros((n, 2), dtype=np.float64)
+    if len(coord_rows):
+        coords[coord_rows[:, 0].astype(np.int64) - 1] = coord_rows[:, 1:3]
+    demands = np.zeros(n, dtype=np.int64)
+    if len(demand_rows):
+        demands[demand_rows[:, 0] - 1] = demand_rows[:, 1]
+
+    data['coords'] = [tuple(xy) for xy in coords.tolist()]
+    data['demands'] = demands.tolist()
     return data
 
 
@@ -9,11 +9,29 @@ Shaking neighborhoods:
 - Shake_N1: Random relocate (move k random customers to random positions)
 - Shake_N2: Random swap (swap k random customer pairs between routes)
 - Shake_N3: Double bridge / random 2-opt (perform k random 2-opt reversals)
+
+All random draws come from the module-level NumPy generator `rng`; each
+shake samples its k steps in a single batch of uniforms, which are mapped
+onto the (changing) index ranges of every step. Use `seed_shaking` for
+reproducible runs.
 """
 
-import random
+import numpy as np
 from src.utils import route_demand
 
+rng = np.random.default_rng()
+
+
+def seed_shaking(seed):
+    """Reseed the shaking generator."""
+    global rng
+    rng = np.random.default_rng(seed)
+
+
+def _pick(u, n):
+    """Map a uniform draw u in [0, 1) to an index in range(n)."""
+    return min(int(u * n), n - 1)
+
 
 def Shake_N1_random_relocate(solution, demands, capacity, k):
     """
@@ -23,8 +41,10 @@ def Shake_N1_random_relocate(solution, demands, capacity, k):
     feasible position in a different route.
     """
     sol = [r[:] for r in solution]
+    loads = [route_demand(r, demands) for r in sol]
+    draws = rng.random((k, 4)).tolist()
 
-    for _ in range(k):
+    for u_r1, u_c, u_r2, u_pos in draws:
         if len(sol) < 2:
             break
 
@@ -32,16 +52,18 @@ def Shake_N1_random_relocate(solution, demands, capacity, k):
         if not valid_routes:
             break
 
-        r1_idx = random.choice(valid_routes)
-        c_idx = random.randint(1, len(sol[r1_idx]) - 2)
+        r1_idx = valid_routes[_pick(u_r1, len(valid_routes))]
+        c_idx = 1 + _pick(u_c, len(sol[r1_idx]) - 2)
         customer = sol[r1_idx][c_idx]
 
-        r2_idx = random.randint(0, len(sol) - 1)
+        r2_idx = _pick(u_r2, len(sol))
 
-        if route_demand(sol[r2_idx], demands) + demands[customer] <= capacity:
+        if loads[r2_idx] + demands[customer] <= capacity:
             sol[r1_idx].pop(c_idx)
-            pos = random.randint(1, len(sol[r2_idx]) - 1)
+            pos = 1 + _pick(u_pos, len(sol[r2_idx]) - 1)
             sol[r2_idx].insert(pos, customer)
+            loads[r1_idx] -= demands[customer]
+            loads[r2_idx] += demands[customer]
 
     sol = [r for r in sol if len(r) > 2]
     return sol
@@ -55,8 +77,10 @@ def Shake_N2_random_swap(solution, demands, capacity, k):
     if the capacity constraints remain satisfied after the swap.
     """
     sol = [r[:] for r in solution]
+    loads = [route_demand(r, demands) for r in sol]
+    draws = rng.random((k, 4)).tolist()
 
-    for _ in range(k):
+    for u_r1, u_r2, u_c1, u_c2 in draws:
         if len(sol) < 2:
             break
 
@@ -64,20 +88,27 @@ def Shake_N2_random_swap(solution, demands, capacity, k):
         if len(valid_routes) < 2:
             break
 
-        r1_idx, r2_idx = random.sample(valid_routes, 2)
+        # Two distinct routes: the second index skips over the first
+        i1 = _pick(u_r1, len(valid_routes))
+        i2 = _pick(u_r2, len(valid_routes) - 1)
+        if i2 >= i1:
+            i2 += 1
+        r1_idx, r2_idx = valid_routes[i1], valid_routes[i2]
 
-        c1_idx = random.randint(1, len(sol[r1_idx]) - 2)
-        c2_idx = random.randint(1, len(sol[r2_idx]) - 2)
+        c1_idx = 1 + _pick(u_c1, len(sol[r1_idx]) - 2)
+        c2_idx = 1 + _pick(u_c2, len(sol[r2_idx]) - 2)
 
         c1 = sol[r1_idx][c1_idx]
         c2 = sol[r2_idx][c2_idx]
 
-        load1 = route_demand(sol[r1_idx], demands) - demands[c1] + demands[c2]
-        load2 = route_demand(sol[r2_idx], demands) - demands[c2] + demands[c1]
+        load1 = loads[r1_idx] - demands[c1] + demands[c2]
+        load2 = loads[r2_idx] - demands[c2] + demands[c1]
 
         if load1 <= capacity and load2 <= capacity:
             sol[r1_idx][c1_idx] = c2
             sol[r2_idx][c2_idx] = c1
+            loads[r1_idx] = load1
+            loads[r2_idx] = load2
 
     return sol
 
@@ -90,18 +121,23 @@ def Shake_N3_double_bridge(solution, demands, capacity, k):
     Inspired by the double-bridge move used in TSP perturbation.
     """
     sol = [r[:] for r in solution]
+    draws = rng.random((k, 3)).tolist()
 
-    for _ in range(k):
+    for u_r, u_i, u_j in draws:
         valid_routes = [i for i, r in enumerate(sol) if len(r) > 4]
         if not valid_routes:
             break
 
-        r_idx = random.choice(valid_routes)
+        r_idx = valid_routes[_pick(u_r, len(valid_routes))]
         route = sol[r_idx]
 
-        i = random.randint(1, len(route) - 3)
-        j = random.randint(i + 1, len(route) - 2)
+        i = 1 + _pick(u_i, len(route) - 3)
+        j = i + 1 + _pick(u_j, len(route) - 2 - i)
 
-        sol[r_idx] = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+        # Reverse route[i..j] in place
+        while i < j:
+            route[i], route[j] = route[j], route[i]
+            i += 1
+            j -= 1
 
     return sol
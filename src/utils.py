@@ -3,29 +3,83 @@
 Distance and cost utility functions for CVRP.
 """
 
-import math
+from itertools import accumulate, chain
 
+import numpy as np
 
-def euclidean(a, b):
-    return math.hypot(a[0] - b[0], a[1] - b[1])
+from src._kernels import NUMBA_AVAILABLE, path_cost
 
 
-def compute_distance_matrix(coords):
-    n = len(coords)
-    dist = [[0.0] * n for _ in range(n)]
-    for i in range(n):
-        for j in range(n):
-            dist[i][j] = euclidean(coords[i], coords[j])
-    return dist
+def compute_distance_matrix(coords, rounded=False, single_precision=False):
+    """
+    Euclidean distance matrix as a contiguous (n, n) float64 array.
 
+    With rounded=True, distances are rounded to the nearest integer with
+    halves up (TSPLIB EUC_2D nint(x) = floor(x + 0.5), used for CVRPLIB
+    best-known costs) and stored as int32, which halves the memory of the
+    matrix. Otherwise, single_precision=True stores the matrix as float32
+    for the same saving, at about 7 significant digits per distance.
 
-def route_cost(route, dist):
-    return sum(dist[route[i]][route[i + 1]] for i in range(len(route) - 1))
+    Uses ||xi - xj||^2 = ||xi||^2 + ||xj||^2 - 2 xi.xj so the bulk of the
+    work is one matrix product. Coordinates are shifted by their rounded
+    mean first: this limits cancellation and keeps integer (TSPLIB)
+    coordinates integral, for which the result is exact. For float
+    coordinates the product is not exactly symmetric, so the matrix is
+    averaged with its transpose: the closed-form move deltas rely on
+    dist[i, j] == dist[j, i]. The other steps run in place on the product.
+    """
+    C = np.asarray(coords, dtype=np.float64)
+    C = C - np.round(C.mean(axis=0))
+    sq = (C * C).sum(axis=1)
+    d2 = C @ C.T
+    d2 *= -2.0
+    d2 += sq[:, None]
+    d2 += sq[None, :]
+    np.maximum(d2, 0.0, out=d2)
+    np.fill_diagonal(d2, 0.0)
+    dist = np.sqrt(d2, out=d2)
+    dist += dist.T
+    dist *= 0.5
+    if rounded:
+        dist += 0.5
+        return np.floor(dist, out=dist).astype(np.int32)
+    if single_precision:
+        return dist.astype(np.float32)
+    return dist
 
 
 def solution_cost(solution, dist):
-    return sum(route_cost(r, dist) for r in solution)
+    """
+    Total cost of all routes, accumulated in float64 whatever the dtype of `dist`.
+
+    The routes are concatenated into one array and costed as a single path:
+    the depot to depot steps between routes add dist[0, 0] = 0.
+    """
+    path = np.fromiter(chain.from_iterable(solution), dtype=np.intp)
+    if NUMBA_AVAILABLE:
+        return path_cost(path, dist)
+    return float(dist[path[:-1], path[1:]].sum(dtype=np.float64))
 
 
 def route_demand(route, demands):
     return sum(demands[c] for c in route if c != 0)
+
+
+def route_prefix_demand(route, demands):
+    """Cumulative demand along a route: element k is the demand of route[:k + 1]."""
+    return list(accumulate(demands[c] if c != 0 else 0 for c in route))
+
+
+def compute_neighbors(dist, k):
+    """
+    K-nearest-customer lists: row c holds the k customers closest to c.
+
+    The depot and c itself are excluded. Rows are returned as nested Python
+    lists, which are faster than array rows for the scalar loops that use them.
+    """
+    d = np.array(dist, dtype=np.float64)
+    np.fill_diagonal(d, np.inf)
+    d[:, 0] = np.inf
+    k = min(k, d.shape[0] - 2)
+    order = np.argsort(d, axis=1, kind='stable')[:, :k]
+    return order.tolist()
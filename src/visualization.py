@@ -3,11 +3,15 @@
 Visualization and solution output utilities.
 """
 
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 from config import DEFAULT_PLOT_DPI
 
 
-def plot_solution(coords, solution, title="CVRP Solution", save_filename=None):
+def plot_solution(coords, solution, title="CVRP Solution", save_filename=None,
+                  show=True):
     """
     Plot routes on a 2D map.
 
@@ -17,37 +21,45 @@ def plot_solution(coords, solution, title="CVRP Solution", save_filename=None):
     solution      : list of routes (each route is a list of node indices)
     title         : plot title
     save_filename : if provided, save the figure to this path
+    show          : display the figure; otherwise it is closed after saving
     """
-    plt.figure(figsize=(12, 10))
+    xy = np.asarray(coords, dtype=np.float64)
+    fig, ax = plt.subplots(figsize=(12, 10))
 
     # Depot
-    plt.scatter(
-        coords[0][0], coords[0][1],
+    depot = ax.scatter(
+        xy[0, 0], xy[0, 1],
         c="red", marker="s", s=300,
         label="Depot", zorder=3,
         edgecolors='black', linewidths=2,
     )
 
-    # Customers
-    for i in range(1, len(coords)):
-        plt.scatter(
-            coords[i][0], coords[i][1],
-            c="lightblue", s=80, zorder=2,
-            edgecolors='black', linewidths=1,
-        )
+    # Customers, as a single scatter
+    ax.scatter(
+        xy[1:, 0], xy[1:, 1],
+        c="lightblue", s=80, zorder=2,
+        edgecolors='black', linewidths=1,
+    )
 
-    # Routes
+    # Routes, as one collection with a polyline per route
     colors = plt.cm.tab20.colors
-    for i, route in enumerate(solution):
-        xs = [coords[c][0] for c in route]
-        ys = [coords[c][1] for c in route]
-        plt.plot(xs, ys, color=colors[i % len(colors)],
-                 linewidth=2.5, alpha=0.7, label=f"Route {i + 1}")
+    route_colors = [colors[i % len(colors)] for i in range(len(solution))]
+    ax.add_collection(LineCollection(
+        [xy[route] for route in solution],
+        colors=route_colors, linewidths=2.5, alpha=0.7,
+    ))
+    ax.autoscale_view()
+
+    # Legend entries for the routes (proxy handles, not drawn on the axes)
+    handles = [depot] + [
+        Line2D([], [], color=color, linewidth=2.5, alpha=0.7, label=f"Route {i + 1}")
+        for i, color in enumerate(route_colors)
+    ]
 
     plt.title(title, fontsize=16, fontweight='bold', pad=20)
     plt.xlabel("X coordinate", fontsize=12)
     plt.ylabel("Y coordinate", fontsize=12)
-    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left', fontsize=9)
+    plt.legend(handles=handles, bbox_to_anchor=(1.05, 1), loc='upper left', fontsize=9)
     plt.grid(True, alpha=0.3, linestyle='--')
     plt.axis('equal')
     plt.tight_layout()
@@ -56,7 +68,10 @@ def plot_solution(coords, solution, title="CVRP Solution", save_filename=None):
         plt.savefig(save_filename, dpi=DEFAULT_PLOT_DPI, bbox_inches='tight')
         print(f"✓ Plot saved as {save_filename}")
 
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close()
 
 
 def save_solution(solution, cost, filename):
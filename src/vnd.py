@@ -5,8 +5,18 @@ Variable Neighborhood Descent (VND) for CVRP.
 Applies a sequence of neighborhood structures in order.
 Restarts from the first neighborhood whenever an improvement is found.
 Terminates when no neighborhood produces an improvement.
+
+VND_parallel descends several solutions at once in a DescentPool of worker
+processes that share the distance matrix.
 """
 
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
 from src.utils import solution_cost
 from src.neighborhoods import (
     N1_two_opt_intra,
@@ -18,7 +28,8 @@ from src.neighborhoods import (
 )
 
 
-def VND(solution, demands, capacity, dist, use_or_opt=False, recorder=None):
+def VND(solution, demands, capacity, dist, use_or_opt=False, recorder=None,
+        neighbors=None):
     """
     Variable Neighborhood Descent.
 
@@ -38,38 +49,46 @@ def VND(solution, demands, capacity, dist, use_or_opt=False, recorder=None):
     dist : precomputed distance matrix
     use_or_opt : bool, enable Or-opt neighborhood (expensive)
     recorder : VNSAnimationRecorder or None
+    neighbors : K-nearest-customer lists (utils.compute_neighbors) used to
+                prune Relocate, Swap and Or-opt, or None for full search
 
     Returns
     -------
-    Locally optimal solution.
+    (locally optimal solution, its cost). The cost is tracked from the
+    deltas reported by the neighborhoods, so it is not recomputed.
     """
+    # (name, function, accepts neighbor lists)
     neighborhoods = [
-        ("2-opt intra",  N1_two_opt_intra),
-        ("Merge routes", N5_merge_routes),
-        ("Relocate",     N2_relocate_inter),
-        ("Swap",         N3_swap_inter),
-        ("2-opt inter",  N4_two_opt_inter),
+        ("2-opt intra",  N1_two_opt_intra,  False),
+        ("Merge routes", N5_merge_routes,   False),
+        ("Relocate",     N2_relocate_inter, True),
+        ("Swap",         N3_swap_inter,     True),
+        ("2-opt inter",  N4_two_opt_inter,  False),
     ]
 
     if use_or_opt:
-        neighborhoods.append(("Or-opt", N6_or_opt))
+        neighborhoods.append(("Or-opt", N6_or_opt, True))
 
     sol = [r[:] for r in solution]
+    cost = solution_cost(sol, dist)
     k = 0
 
     while k < len(neighborhoods):
-        old_cost = solution_cost(sol, dist)
+        old_cost = cost
         old_routes = len(sol)
 
-        name, func = neighborhoods[k]
+        name, func, pruned = neighborhoods[k]
 
         # N1 only needs dist; the rest also need demands, capacity
         if k == 0:
-            sol_new = func(sol, dist)
+            sol_new, delta = func(sol, dist)
+        elif pruned:
+            sol_new, delta = func(sol, demands, capacity, dist, neighbors)
         else:
-            sol_new = func(sol, demands, capacity, dist)
+            sol_new, delta = func(sol, demands, capacity, dist)
 
-        new_cost = solution_cost(sol_new, dist)
+        # Neighborhoods report the cost change of their moves
+        new_cost = old_cost + delta
         new_routes = len(sol_new)
 
         cost_improved = new_cost < old_cost - 1e-6
@@ -77,7 +96,8 @@ def VND(solution, demands, capacity, dist, use_or_opt=False, recorder=None):
 
         if cost_improved or routes_reduced:
             sol = sol_new
-            if recorder and cost_improved:
+            cost = new_cost
+            if recorder and cost_improved and recorder.wants_frame(new_cost):
                 improvement = old_cost - new_cost
                 recorder.add_frame(
                     sol, new_cost,
@@ -88,4 +108,99 @@ def VND(solution, demands, capacity, dist, use_or_opt=False, recorder=None):
         else:
             k += 1
 
-    return sol
+    return sol, cost
+
+
+# Per-process state of DescentPool workers, set once by _init_descent_worker
+_worker = {}
+
+
+def _init_descent_worker(shm_name, shape, dtype, demands, capacity,
+                         use_or_opt, neighbors):
+    """Attach a worker process to the shared distance matrix."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(
+        shm=shm,  # keeps the mapping alive
+        dist=np.ndarray(shape, dtype=dtype, buffer=shm.buf),
+        demands=demands,
+        capacity=capacity,
+        use_or_opt=use_or_opt,
+        neighbors=neighbors,
+    )
+
+
+def _descend(solution):
+    """Run VND on one solution inside a worker; returns (solution, cost)."""
+    return VND(solution, _worker['demands'], _worker['capacity'], _worker['dist'],
+               use_or_opt=_worker['use_or_opt'], neighbors=_worker['neighbors'])
+
+
+def _release(executor, shm):
+    executor.shutdown()
+    shm.close()
+    shm.unlink()
+
+
+class DescentPool:
+    """
+    Worker processes that run VND on independent solutions.
+
+    The distance matrix is copied once into shared memory and every worker
+    maps it read-only, so tasks only carry the solutions themselves. The
+    instance data (demands, capacity, neighbor lists) is sent once per
+    worker at start-up.
+
+    Workers are spawned rather than forked: they need nothing inherited
+    from the parent, and forking after Numba's threading layer has started
+    can leave the pool hung at exit.
+    """
+
+    def __init__(self, dist, demands, capacity, n_workers,
+                 use_or_opt=False, neighbors=None):
+        dist = np.ascontiguousarray(dist)
+        shm = shared_memory.SharedMemory(create=True, size=dist.nbytes)
+        np.ndarray(dist.shape, dtype=dist.dtype, buffer=shm.buf)[:] = dist
+
+        executor = ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_descent_worker,
+            initargs=(shm.name, dist.shape, dist.dtype.str, demands, capacity,
+                      use_or_opt, neighbors),
+        )
+        self.n_workers = n_workers
+        self._executor = executor
+        # Releases the workers and the shared block even if close() is never called
+        self._finalizer = weakref.finalize(self, _release, executor, shm)
+
+    def map(self, solutions):
+        return list(self._executor.map(_descend, solutions))
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def VND_parallel(solutions, pool):
+    """
+    Descend several (e.g. differently shaken) solutions in parallel.
+
+    Parameters
+    ----------
+    solutions : list of solutions, one VND descent each
+    pool : DescentPool
+
+    Returns
+    -------
+    (solution, cost, index) of the best local optimum, where index is its
+    position in `solutions`; ties go to fewer routes.
+    """
+    results = pool.map(solutions)
+    index = min(range(len(results)),
+                key=lambda i: (results[i][1], len(results[i][0])))
+    return results[index][0], results[index][1], index
@@ -5,15 +5,29 @@ Variable Neighborhood Search (VNS) solver for CVRP.
 Orchestrates:
 - Initial solution construction
 - VND local search
-- Shaking perturbations
+- Shaking perturbations (optionally several descended in parallel)
 - Tabu list to prevent cycling
 - Optional animation recording
+
+VNS_independent_runs runs several seeded searches in parallel processes
+and keeps the best.
 """
 
+import contextlib
+import io
+import math
+import multiprocessing
+import os
+import random
 import time
-from copy import deepcopy
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+
+import numpy as np
 
-from src.utils import compute_distance_matrix, solution_cost
+from src.utils import compute_distance_matrix, compute_neighbors, solution_cost
 from src.construction import (
     savings_algorithm,
     nearest_neighbor_vrp,
@@ -25,33 +39,70 @@ from src.shaking import (
     Shake_N1_random_relocate,
     Shake_N2_random_swap,
     Shake_N3_double_bridge,
+    seed_shaking,
 )
-from src.vnd import VND
+from src.neighborhoods import N1_two_opt_intra
+from src.vnd import VND, VND_parallel, DescentPool
 from src.animation import VNSAnimationRecorder
 from config import (
     K_MAX,
+    SHAKE_REWARD_DECAY,
     TABU_TENURE_MIN,
     TABU_TENURE_MAX,
     PATIENCE_MIN,
     PATIENCE_MAX,
+    MULTISTART_SAVINGS_NOISE,
+    NEIGHBOR_LIST_SIZE,
 )
 
+# Construction method -> (function, needs dist, label)
+CONSTRUCTION_MAP = {
+    'Clarke-Wright':       (savings_algorithm,        True,  "Clarke-Wright Savings"),
+    'nearest_neighbor':    (nearest_neighbor_vrp,     True,  "Nearest Neighbor"),
+    'greedy':              (greedy_vrp,               True,  "Greedy Algorithm"),
+    'cheapest_insertion':  (cheapest_insertion_vrp,   True,  "Cheapest Insertion"),
+    'random':              (random_initial_solution,  False, "Random"),
+}
+
+# Construction methods that produce different solutions for different seeds
+MULTISTART_METHODS = ('Clarke-Wright', 'random')
 
-def _build_initial_solution(method, coords, demands, capacity, dist):
-    """Select and run the chosen construction heuristic."""
-    method_map = {
-        'Clarke-Wright':       (savings_algorithm,        True,  "Clarke-Wright Savings"),
-        'nearest_neighbor':    (nearest_neighbor_vrp,     True,  "Nearest Neighbor"),
-        'greedy':              (greedy_vrp,               True,  "Greedy Algorithm"),
-        'cheapest_insertion':  (cheapest_insertion_vrp,   True,  "Cheapest Insertion"),
-        'random':              (random_initial_solution,  False, "Random"),
-    }
 
-    if method not in method_map:
+def _build_initial_solution(method, coords, demands, capacity, dist, multistart=1):
+    """
+    Select and run the chosen construction heuristic.
+
+    With multistart > 1 and a seedable method (see MULTISTART_METHODS),
+    that many starts are built in parallel and the cheapest one is kept.
+    The workers are spawned (see DescentPool) and map the distance matrix
+    from shared memory, so each task only carries its seed.
+    """
+    if method not in CONSTRUCTION_MAP:
         print(f"Unknown method '{method}', falling back to Clarke-Wright.")
         method = 'Clarke-Wright'
 
-    func, needs_dist, label = method_map[method]
+    func, needs_dist, label = CONSTRUCTION_MAP[method]
+
+    if multistart > 1 and method in MULTISTART_METHODS:
+        base_seed = random.randrange(2 ** 32)
+        tasks = [(method, base_seed + i, i == 0) for i in range(multistart)]
+        workers = min(multistart, os.cpu_count() or 1)
+        dist = np.ascontiguousarray(dist)
+        shm = shared_memory.SharedMemory(create=True, size=dist.nbytes)
+        try:
+            np.ndarray(dist.shape, dtype=dist.dtype, buffer=shm.buf)[:] = dist
+            with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_start_worker,
+                    initargs=(shm.name, dist.shape, dist.dtype.str,
+                              coords, demands, capacity)) as executor:
+                starts = list(executor.map(_build_one, tasks))
+        finally:
+            shm.close()
+            shm.unlink()
+        solution = min(starts, key=lambda sol: solution_cost(sol, dist))
+        return solution, f"{label}, best of {multistart} starts"
 
     if needs_dist:
         solution = func(coords, demands, capacity, dist)
@@ -61,16 +112,112 @@ def _build_initial_solution(method, coords, demands, capacity, dist):
     return solution, label
 
 
+# Per-process state of multi-start workers, set once by _init_start_worker
+_start_worker = {}
+
+
+def _init_start_worker(shm_name, shape, dtype, coords, demands, capacity):
+    """Attach a multi-start worker to the shared distance matrix."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _start_worker.update(
+        shm=shm,  # keeps the mapping alive
+        dist=np.ndarray(shape, dtype=dtype, buffer=shm.buf),
+        coords=coords,
+        demands=demands,
+        capacity=capacity,
+    )
+
+
+def _build_one(task):
+    """Build one multi-start candidate: seeded construction plus a 2-opt pass."""
+    method, seed, first = task
+    dist = _start_worker['dist']
+    coords = _start_worker['coords']
+    demands = _start_worker['demands']
+    capacity = _start_worker['capacity']
+    random.seed(seed)
+
+    if method == 'Clarke-Wright':
+        # The first start keeps the deterministic (noise-free) savings order
+        noise = 0.0 if first else MULTISTART_SAVINGS_NOISE
+        solution = savings_algorithm(coords, demands, capacity, dist,
+                                     noise=noise, seed=seed)
+    else:
+        solution = random_initial_solution(coords, demands, capacity)
+
+    return N1_two_opt_intra(solution, dist)[0]
+
+
+@lru_cache(maxsize=4096)
+def _route_hash(route):
+    """
+    Hash of a route's customer set (order and direction ignored).
+
+    Takes the route as a tuple and is memoized: shakes and VND leave most
+    routes of the incumbent untouched, so repeated routes are not rehashed.
+    A frozenset needs neither a sort nor a slice (the depot is in every
+    route, so keeping it does not change which routes collide).
+    """
+    return hash(frozenset(route))
+
+
 def _solution_hash(sol):
-    """Canonical hash for tabu list membership check."""
-    return tuple(sorted([tuple(sorted(r[1:-1])) for r in sol]))
+    """
+    Canonical hash for tabu list membership check.
+
+    XOR of the route hashes, so it does not depend on the order of the
+    routes. Routes are customer-disjoint, so no two of them cancel out.
+    """
+    key = 0
+    for route in sol:
+        key ^= _route_hash(tuple(route))
+    return key
+
+
+def _ucb_select(scores, uses, scale):
+    """
+    UCB1 choice of a shaking neighborhood.
+
+    Every neighborhood is tried once first; then the index maximising the
+    score (normalized by `scale`, the largest reward seen so far) plus the
+    exploration bonus sqrt(2 ln t / n_i) is returned.
+    """
+    for i, n_i in enumerate(uses):
+        if n_i == 0:
+            return i
+    top = scale or 1.0
+    log_t = math.log(sum(uses))
+    return max(range(len(scores)),
+               key=lambda i: scores[i] / top + math.sqrt(2.0 * log_t / uses[i]))
+
+
+def _credit_shakes(scores, uses, tried, winner, reward):
+    """
+    Update the shake statistics after an iteration.
+
+    `tried` lists the shake index of every candidate shaken this iteration
+    (tabu ones included). Each counts as a use; only the candidate at
+    position `winner` (None if no candidate won) earns `reward`, the others
+    decay towards zero.
+    """
+    for pos, idx in enumerate(tried):
+        r = reward if pos == winner else 0.0
+        uses[idx] += 1
+        scores[idx] += SHAKE_REWARD_DECAY * (r - scores[idx])
 
 
 def VNS_solver(coords, demands, capacity,
                max_iter=1000, max_time=600,
                construction_method='Clarke-Wright',
                use_or_opt=False,
-               enable_animation=False):
+               enable_animation=False,
+               multistart=1,
+               parallel_descents=1,
+               round_distances=False,
+               single_precision=False,
+               adaptive_shaking=True,
+               seed=None,
+               verbose=True):
     """
     Enhanced Variable Neighborhood Search for CVRP.
 
@@ -85,21 +232,47 @@ def VNS_solver(coords, demands, capacity,
                           'greedy', 'cheapest_insertion', 'random'
     use_or_opt        : enable Or-opt neighborhood in VND (slower)
     enable_animation  : record improvements for video export
+    multistart        : number of initial solutions built in parallel
+                        (Clarke-Wright and random only); the best is kept
+    parallel_descents : shaken solutions descended in parallel per
+                        iteration, with shake sizes k, k+1, ... (cyclic);
+                        the best local optimum is the iteration's candidate
+    round_distances   : use integer (EUC_2D rounded) distances, as in the
+                        CVRPLIB best-known costs
+    single_precision  : store the distance matrix as float32 (half the
+                        memory); ignored with round_distances
+    adaptive_shaking  : pick the shaking operator by UCB1 on its recent
+                        cost improvement per second; False cycles the
+                        operators with k
+    seed              : seed for construction and shaking randomness, or
+                        None for an unseeded run
+    verbose           : print a progress row for every accepted solution;
+                        with False only the setup and summary lines are
+                        printed
 
     Returns
     -------
     best_solution, best_cost, recorder (None if animation disabled)
     """
-    dist = compute_distance_matrix(coords)
+    if seed is not None:
+        random.seed(seed)
+        seed_shaking(seed)
+
+    dist = compute_distance_matrix(coords, rounded=round_distances,
+                                   single_precision=single_precision)
+    neighbors = compute_neighbors(dist, NEIGHBOR_LIST_SIZE) if NEIGHBOR_LIST_SIZE > 0 else None
     n = len(coords)
 
     print(f"Instance: {n} customers, capacity: {capacity}")
     print(f"Construction method: {construction_method}")
     print(f"Or-opt enabled: {use_or_opt}")
     print(f"Animation enabled: {enable_animation}")
+    print(f"Rounded distances: {round_distances}")
+    print(f"Distance matrix: {dist.dtype}")
 
     # --- Initial solution ---
-    s, method_label = _build_initial_solution(construction_method, coords, demands, capacity, dist)
+    s, method_label = _build_initial_solution(construction_method, coords, demands,
+                                              capacity, dist, multistart=multistart)
     init_cost = solution_cost(s, dist)
     print(f"Initial solution ({method_label}): {len(s)} routes, cost = {init_cost:.2f}")
 
@@ -107,9 +280,12 @@ def VNS_solver(coords, demands, capacity,
     recorder = VNSAnimationRecorder(coords, s, init_cost) if enable_animation else None
 
     # --- Apply VND to initial solution ---
-    s = VND(s, demands, capacity, dist, use_or_opt=use_or_opt, recorder=recorder)
-    best = deepcopy(s)
+    # VND returns a fresh solution and `best` is only ever read or rebound,
+    # so neither it nor accepted solutions below need copying
+    best, _ = VND(s, demands, capacity, dist, use_or_opt=use_or_opt, recorder=recorder,
+                  neighbors=neighbors)
     best_cost = solution_cost(best, dist)
+    best_key = _solution_hash(best)
     print(f"After initial VND: {len(best)} routes, cost = {best_cost:.2f}")
 
     # --- Shaking neighborhoods ---
@@ -118,10 +294,18 @@ def VNS_solver(coords, demands, capacity,
         ("Random Swap",     Shake_N2_random_swap),
         ("Double Bridge",   Shake_N3_double_bridge),
     ]
+    n_shakes = len(shake_neighborhoods)
+
+    # With adaptive_shaking, each shake keeps a decayed score of cost
+    # improvement per second spent shaking and descending from it
+    shake_score = [0.0] * n_shakes
+    shake_uses = [0] * n_shakes
+    shake_scale = 0.0
 
-    # --- Tabu list ---
-    tabu_list = []
+    # --- Tabu list: FIFO of recent hashes plus a set for membership ---
     tabu_tenure = min(TABU_TENURE_MAX, max(TABU_TENURE_MIN, n // 20))
+    tabu_list = deque(maxlen=tabu_tenure)
+    tabu_set = set()
 
     # --- VNS parameters ---
     k_max = K_MAX
@@ -129,34 +313,78 @@ def VNS_solver(coords, demands, capacity,
     iteration = 0
     last_improvement = 0
     tabu_skips = 0
-    start_time = time.time()
+    # One clock read per iteration serves the time limit, the shake rewards
+    # and the final report
+    start_time = time.perf_counter()
+    now = start_time
 
     patience = min(PATIENCE_MAX, max(PATIENCE_MIN, n // 5))
     min_iterations = max(50, n // 10)
 
+    # --- Parallel descents (VND steps in workers are not recorded) ---
+    descent_pool = None
+    if parallel_descents > 1:
+        descent_pool = DescentPool(dist, demands, capacity, parallel_descents,
+                                   use_or_opt=use_or_opt, neighbors=neighbors)
+
     print(f"\nStarting VNS (max_iter={max_iter}, max_time={max_time}s, patience={patience})")
     print(f"Tabu tenure: {tabu_tenure}, k_max: {k_max}")
-    print(f"{'Iter':<8} {'k':<4} {'Cost':<12} {'Routes':<8} {'Best':<12} {'Tabu':<6} {'Status':<20}")
-    print("-" * 90)
+    if verbose:
+        print(f"{'Iter':<8} {'k':<4} {'Cost':<12} {'Routes':<8} {'Best':<12} {'Tabu':<6} {'Status':<20}")
+        print("-" * 90)
 
-    while iteration < max_iter and (time.time() - start_time) < max_time:
+    while iteration < max_iter and now - start_time < max_time:
+        iter_start = now
 
         # --- Shaking ---
-        shake_idx = (k - 1) % len(shake_neighborhoods)
-        shake_name, shake_func = shake_neighborhoods[shake_idx]
-        s_shaken = shake_func(best, demands, capacity, k)
-
-        # --- Tabu check ---
-        if _solution_hash(s_shaken) in tabu_list:
-            tabu_skips += 1
+        if adaptive_shaking:
+            shake_base = _ucb_select(shake_score, shake_uses, shake_scale)
+
+        shaken = []
+        tried = []           # shake index of each candidate
+        shaken_pos = []      # position in `tried` of each non-tabu candidate
+        for i in range(parallel_descents):
+            k_i = (k - 1 + i) % k_max + 1
+            if adaptive_shaking:
+                shake_idx = (shake_base + i) % n_shakes
+            else:
+                shake_idx = (k_i - 1) % n_shakes
+            shake_name, shake_func = shake_neighborhoods[shake_idx]
+            s_shaken = shake_func(best, demands, capacity, k_i)
+            tried.append(shake_idx)
+
+            # --- Tabu check (nothing to hash while the list is empty) ---
+            if tabu_set:
+                # Double Bridge only reorders customers within routes, so
+                # its candidate always has the incumbent's hash
+                if shake_func is Shake_N3_double_bridge:
+                    key = best_key
+                else:
+                    key = _solution_hash(s_shaken)
+                if key in tabu_set:
+                    tabu_skips += 1
+                    continue
+            shaken.append(s_shaken)
+            shaken_pos.append(i)
+
+        if not shaken:
             k = k % k_max + 1
             iteration += 1
+            now = time.perf_counter()
+            if adaptive_shaking:
+                # Only tabu candidates: uses without reward, so that UCB1
+                # moves on instead of picking the same shake forever
+                _credit_shakes(shake_score, shake_uses, tried, None, 0.0)
             continue
 
         # --- Local search ---
-        s_local = VND(s_shaken, demands, capacity, dist,
-                      use_or_opt=use_or_opt, recorder=recorder)
-        cost_local = solution_cost(s_local, dist)
+        if descent_pool is None:
+            s_local, cost_local = VND(shaken[0], demands, capacity, dist,
+                                      use_or_opt=use_or_opt, recorder=recorder,
+                                      neighbors=neighbors)
+            winner = 0
+        else:
+            s_local, cost_local, winner = VND_parallel(shaken, descent_pool)
         routes_local = len(s_local)
 
         # --- Acceptance ---
@@ -164,6 +392,11 @@ def VNS_solver(coords, demands, capacity,
         status = ""
         improvement = 0.0
 
+        # VND costs are tracked from move deltas, which carry rounding
+        # (notably with a float32 matrix); confirm candidates exactly
+        if cost_local < best_cost - 1e-6 or routes_local < len(best):
+            cost_local = solution_cost(s_local, dist)
+
         if cost_local < best_cost - 1e-6:
             accept = True
             improvement = best_cost - cost_local
@@ -173,19 +406,28 @@ def VNS_solver(coords, demands, capacity,
             status = "FEWER ROUTES"
 
         if accept:
-            best = deepcopy(s_local)
+            best = s_local
             best_cost = cost_local
             last_improvement = iteration
             k = 1
 
-            tabu_list.append(_solution_hash(s_local))
-            if len(tabu_list) > tabu_tenure:
-                tabu_list.pop(0)
-
-            print(f"{iteration:<8} {k:<4} {cost_local:<12.2f} {routes_local:<8} "
-                  f"{best_cost:<12.2f} {len(tabu_list):<6} {status:<20}")
-
-            if recorder and improvement > 0:
+            # The hash ignores the order within routes, so a reordering of
+            # a recent solution can be accepted again: queue each hash once,
+            # or evicting the older copy would drop it from the set early
+            key = best_key = _solution_hash(s_local)
+            if key not in tabu_set:
+                if len(tabu_list) == tabu_list.maxlen:
+                    # The append below evicts the oldest entry; keys are
+                    # unique in the deque, so it also leaves the set
+                    tabu_set.discard(tabu_list[0])
+                tabu_list.append(key)
+                tabu_set.add(key)
+
+            if verbose:
+                print(f"{iteration:<8} {k:<4} {cost_local:<12.2f} {routes_local:<8} "
+                      f"{best_cost:<12.2f} {len(tabu_list):<6} {status:<20}")
+
+            if recorder and improvement > 0 and recorder.wants_frame(best_cost):
                 recorder.add_frame(
                     best, best_cost,
                     f"VNS Improvement — Iter {iteration}",
@@ -195,10 +437,17 @@ def VNS_solver(coords, demands, capacity,
             k = k % k_max + 1
 
         iteration += 1
+        now = time.perf_counter()
+
+        if adaptive_shaking:
+            # The reward goes to the operator whose candidate won the descent
+            reward = improvement / max(now - iter_start, 1e-9)
+            shake_scale = max(shake_scale, reward)
+            _credit_shakes(shake_score, shake_uses, tried, shaken_pos[winner], reward)
 
         # --- Early stopping ---
         if iteration > min_iterations and (iteration - last_improvement) > patience:
-            elapsed = time.time() - start_time
+            elapsed = now - start_time
             print(f"\n{'='*90}")
             print(f"Early stopping: No improvement for {patience} iterations")
             print(f"Total iterations: {iteration}, Time: {elapsed:.1f}s")
@@ -206,7 +455,10 @@ def VNS_solver(coords, demands, capacity,
             print(f"{'='*90}")
             break
 
-    elapsed_time = time.time() - start_time
+    if descent_pool is not None:
+        descent_pool.close()
+
+    elapsed_time = now - start_time
 
     if iteration >= max_iter or elapsed_time >= max_time:
         print(f"\n{'='*90}")
@@ -216,3 +468,38 @@ def VNS_solver(coords, demands, capacity,
 
     print(f"Final solution: {len(best)} routes, cost = {best_cost:.2f}")
     return best, best_cost, recorder
+
+
+def VNS_independent_runs(coords, demands, capacity, n_runs, **solver_kwargs):
+    """
+    Run `n_runs` independent VNS searches in parallel processes.
+
+    Each run calls VNS_solver with its own seed and the given keyword
+    arguments; only the first run prints its log. Returns the best run's
+    (best_solution, best_cost, recorder), preferring fewer routes on ties.
+
+    The runs' own pools share the cores: `multistart` and
+    `parallel_descents` are divided by the number of concurrent runs.
+    """
+    workers = min(n_runs, os.cpu_count() or 1)
+    solver_kwargs = dict(solver_kwargs)
+    for name in ('multistart', 'parallel_descents'):
+        if name in solver_kwargs:
+            solver_kwargs[name] = max(1, solver_kwargs[name] // workers)
+
+    base_seed = random.randrange(2 ** 32)
+    tasks = [(base_seed + i, i == 0, coords, demands, capacity, solver_kwargs)
+             for i in range(n_runs)]
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        runs = list(executor.map(_run_one, tasks))
+    return min(runs, key=lambda run: (run[1], len(run[0])))
+
+
+def _run_one(task):
+    """One seeded VNS_solver run for VNS_independent_runs."""
+    seed, verbose, coords, demands, capacity, solver_kwargs = task
+    if verbose:
+        return VNS_solver(coords, demands, capacity, seed=seed, **solver_kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return VNS_solver(coords, demands, capacity, seed=seed, **solver_kwargs)